@@ -19,7 +19,7 @@ from app.core.security import verify_token, create_access_token, generate_short_
 from app.core.log_utils import mask_name, mask_token
 from app.models import SurveySession
 from app.schemas import TokenValidationResponse
-from app.services.bitrix24 import Bitrix24Client
+from app.services.bitrix24 import bitrix24_client
 
 router = APIRouter()
 
@@ -130,7 +130,7 @@ async def validate_token(
     patient_name = token_data.patient_name
     if not patient_name and settings.BITRIX24_WEBHOOK_URL:
         try:
-            bitrix_client = Bitrix24Client()
+            bitrix_client = bitrix24_client
             entity_type = token_data.entity_type or "DEAL"
             if entity_type == "DEAL":
                 patient_name = await bitrix_client.get_patient_name_from_deal(token_data.lead_id)
@@ -7,6 +7,7 @@
 """
 
 from typing import Optional
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
 from loguru import logger
@@ -15,7 +16,7 @@ from app.core.config import settings
 from app.core.security import create_access_token, generate_short_code
 from app.core.log_utils import mask_name
 from app.core.redis import get_redis, RedisClient
-from app.services.bitrix24 import Bitrix24Client
+from app.services.bitrix24 import bitrix24_client
 
 
 router = APIRouter()
@@ -95,7 +96,8 @@ async def bitrix_webhook(
     
     try:
         if "application/json" in content_type:
-            raw_data = await request.json()
+            # orjson разбирает тело прямо из bytes, без промежуточного str
+            raw_data = orjson.loads(await request.body())
         else:
             # Битрикс24 обычно отправляет form-data
             form = await request.form()
@@ -161,7 +163,7 @@ async def bitrix_webhook(
         # ВСЕГДА получаем category_id из API Битрикс24 — не доверяем параметру из запроса
         if entity_type == "DEAL" and settings.BITRIX24_WEBHOOK_URL:
             try:
-                bitrix_client = Bitrix24Client()
+                bitrix_client = bitrix24_client
                 deal_data = await bitrix_client.get_deal(lead_id)
                 if deal_data:
                     resolved_category_id = str(deal_data.get("CATEGORY_ID", "")).strip() or None
@@ -205,7 +207,7 @@ async def bitrix_webhook(
     
     # Если имя пациента не передано (или было шаблоном) — получаем из CRM
     if not patient_name and settings.BITRIX24_WEBHOOK_URL:
-        bitrix_client = Bitrix24Client()
+        bitrix_client = bitrix24_client
         if entity_type == "DEAL":
             patient_name = await bitrix_client.get_patient_name_from_deal(lead_id)
         if patient_name:
@@ -215,7 +217,7 @@ async def bitrix_webhook(
 
     if entity_type == "DEAL" and settings.BITRIX24_WEBHOOK_URL:
         try:
-            bitrix_client = Bitrix24Client()
+            bitrix_client = bitrix24_client
             doctor_name = await bitrix_client.get_doctor_name_from_deal(lead_id)
             if doctor_name:
                 logger.info(f"Имя врача загружено из CRM для сделки {lead_id}")
@@ -243,13 +245,15 @@ async def bitrix_webhook(
     
     # Обновление данных сделки в Битрикс24
     if settings.BITRIX24_WEBHOOK_URL:
-        bitrix_client = Bitrix24Client()
+        bitrix_client = bitrix24_client
 
-        # Запись ссылки в пользовательское поле UF_CRM_1771160085 (для отправки через SMS/WhatsApp)
+        # Запись ссылки в пользовательское поле UF_CRM_1771160085 (для отправки через SMS/WhatsApp).
+        # Ответ вебхука ждёт этой записи, поэтому она идёт напрямую, минуя очередь batch
         if entity_type == "DEAL":
             updated = await bitrix_client.update_deal_field(
                 deal_id=lead_id,
-                fields={"UF_CRM_1771160085": survey_url}
+                fields={"UF_CRM_1771160085": survey_url},
+                direct=True,
             )
             if updated:
                 logger.info(f"Ссылка записана в поле UF_CRM_1771160085 сделки {lead_id}")
@@ -35,7 +35,7 @@ from app.schemas import (
 )
 from app.services.survey_engine import SurveyEngine
 from app.services.report_generator import ReportGenerator
-from app.services.bitrix24 import Bitrix24Client
+from app.services.bitrix24 import Bitrix24Client, bitrix24_client
 
 router = APIRouter()
 
@@ -367,7 +367,7 @@ async def start_survey(
     portal_clinic_bucket = Bitrix24Client.DEFAULT_PORTAL_CLINIC_BUCKET
     if settings.BITRIX24_WEBHOOK_URL:
         try:
-            bitrix_client = Bitrix24Client()
+            bitrix_client = bitrix24_client
             entity_type = token_data.entity_type or "DEAL"
             if entity_type == "DEAL":
                 deal_data = await bitrix_client.get_deal(token_data.lead_id)
@@ -377,7 +377,11 @@ async def start_survey(
                 if doctor_name is None:
                     doctor_name = bitrix_client.extract_doctor_name_from_deal(deal_data)
                 if not patient_name:
-                    patient_name = await bitrix_client.get_patient_name_from_deal(token_data.lead_id)
+                    # Сделка уже загружена выше — передаём CONTACT_ID, чтобы не запрашивать её повторно
+                    patient_name = await bitrix_client.get_patient_name_from_deal(
+                        token_data.lead_id,
+                        contact_id=(deal_data or {}).get("CONTACT_ID"),
+                    )
             if patient_name:
                 logger.info(f"Имя пациента загружено из CRM при старте опроса: {mask_name(patient_name)}")
         except Exception as e:
@@ -675,7 +679,7 @@ async def _process_survey_report(
                 }
                 logger.info(f"[BG] Снимок отчёта сохранён: session_id={session_id}")
 
-            bitrix_client = Bitrix24Client()
+            bitrix_client = bitrix24_client
             report_sent = False
             pdf_sent = False
 
@@ -67,6 +67,13 @@ class Settings(BaseSettings):
     BITRIX24_INCOMING_TOKEN: str = ""  # Токен для проверки входящих запросов ОТ Битрикс24
     BITRIX24_ALLOWED_CATEGORIES: str = ""  # Разрешённые ID воронок через запятую (например "19,25"). Пусто = все воронки.
     BITRIX24_DEFAULT_RESPONSIBLE_ID: int = 0  # Дефолтный ответственный для дела, если не удалось получить из сделки (0 = не задавать)
+    BITRIX24_BATCH_MAX_SIZE: int = 50  # Максимум команд в одном коалесцированном batch-запросе (не больше 50)
+    BITRIX24_BATCH_MAX_WAIT_MS: int = 0  # Окно накопления команд перед отправкой batch (0 = отправлять сразу, без очереди)
+    BITRIX24_DISK_FOLDER_ID: int = 0  # Папка диска для потоковой загрузки PDF-отчётов (0 = загрузка base64-вложением)
+    BITRIX24_MAX_RETRIES: int = 3  # Повторы запроса при 429/503 (и 5xx для чтения) с экспоненциальной паузой (0 = без повторов)
+    BITRIX24_RATE_LIMIT_PER_SECOND: float = 2.0  # Лимит запросов к вебхуку в секунду (0 = без ограничения)
+    BITRIX24_RATE_LIMIT_BURST: int = 50  # Ёмкость token bucket: сколько запросов можно отправить подряд без ожидания
+    BITRIX24_HTTP2: bool = True  # HTTP/2 для запросов к Битрикс24 (нужен пакет h2; без него — HTTP/1.1)
     
     @property
     def ALLOWED_CATEGORY_IDS(self) -> List[str]:
@@ -18,6 +18,7 @@ import sys
 from app.core.config import settings
 from app.core.database import engine, Base
 from app.core.redis import redis_client
+from app.services.bitrix24 import bitrix24_client
 from app.api.v1.router import api_router
 from app.admin.setup import setup_admin
 from app.core.middleware import RateLimitMiddleware
@@ -64,6 +65,7 @@ async def lifespan(app: FastAPI):
     
     logger.info("👋 Остановка приложения...")
     await redis_client.disconnect()
+    await bitrix24_client.aclose()
     await engine.dispose()
 
 
@@ -9,10 +9,18 @@ HTTP-клиент для отправки данных в Битрикс24.
 - Прикрепление файлов к карточке сделки/лида
 """
 
+import asyncio
 import base64
+import functools
+import importlib.util
+import io
+import random
 import httpx
+import orjson
+from cachetools import TTLCache
 from datetime import datetime
 from typing import Any, Optional
+from urllib.parse import urlencode
 from zoneinfo import ZoneInfo
 from loguru import logger
 
@@ -21,6 +29,205 @@ from app.core.log_utils import mask_name
 from app.services.doctor_portal_routing import extract_portal_routing_from_deal
 
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+# HTTP/2 в httpx требует пакет h2 (httpx[http2]); без него клиент работает по HTTP/1.1
+_H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Коды типов сущностей для crm.timeline.comment.add (ENTITY_TYPE)
+_ENTITY_TYPE_MAP = {"DEAL": "deal", "LEAD": "lead"}
+# Методы обновления полей сущности
+_ENTITY_UPDATE_METHODS = {"DEAL": "crm.deal.update", "LEAD": "crm.lead.update"}
+# OWNER_TYPE_ID для crm.activity.add: 2 = DEAL, 1 = LEAD
+_ENTITY_OWNER_TYPE_ID = {"DEAL": 2, "LEAD": 1}
+# Часовой пояс клиники для сроков дел (создаётся один раз при импорте)
+_MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+
+# Ответы, при которых Битрикс24 гарантированно не выполнил запрос
+# (превышен лимит запросов / портал временно недоступен) — повтор безопасен
+RETRY_ALWAYS_STATUSES = frozenset({429, 503})
+# Ошибки шлюза: запрос мог выполниться, поэтому повторяются только чтения
+RETRY_READ_ONLY_STATUSES = frozenset({500, 502, 504})
+# Верхняя граница паузы между повторами, секунды
+RETRY_MAX_DELAY_SECONDS = 8.0
+
+
+class Bitrix24RateLimiter:
+    """
+    Клиентский token bucket под лимит Битрикс24 на вебхук.
+
+    Ведро ёмкостью burst пополняется со скоростью rate токенов в секунду;
+    каждый запрос забирает один токен или ждёт его появления.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Ожидание свободного токена."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated_at is not None:
+                    self._tokens = min(
+                        self.burst,
+                        self._tokens + (now - self._updated_at) * self.rate,
+                    )
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Bitrix24Batcher:
+    """
+    Очередь коалесцирования вызовов Битрикс24.
+
+    Команды накапливаются и отправляются одним вызовом batch, когда
+    набралось max_batch команд или истекло max_wait_ms с момента
+    постановки первой команды в очередь. Пачки отправляются параллельно:
+    медленный batch не задерживает сбор следующей.
+    """
+
+    def __init__(self, client: "Bitrix24Client", max_batch: int, max_wait_ms: int):
+        self._client = client
+        self.max_batch = max(1, min(max_batch, Bitrix24Client.BATCH_MAX_COMMANDS))
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        # Пачки в полёте (сильные ссылки, чтобы aclose мог их отменить)
+        self._flushes: set[asyncio.Task] = set()
+
+    async def submit(self, method: str, params: dict) -> dict:
+        """
+        Постановка команды в очередь и ожидание её результата.
+
+        Returns:
+            Ответ в формате одиночного вызова REST:
+            {"result": ...} или {"error": ..., "error_description": ...}
+        """
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((method, params, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Фоновый цикл: собирает пачку команд и отправляет её."""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            try:
+                while len(pending) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Команды уже вынуты из очереди: aclose их не увидит
+                self._close_pending(pending)
+                raise
+
+            flush = asyncio.create_task(self._flush(pending))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, pending: list[tuple[str, dict, asyncio.Future]]) -> None:
+        """Отправка пачки команд одним batch-запросом и разбор результатов."""
+        cmd = {str(index): (method, params) for index, (method, params, _) in enumerate(pending)}
+
+        try:
+            try:
+                batch_result = await self._client.batch(cmd)
+            except Exception as e:
+                batch_result = None
+                logger.error(f"Ошибка отправки пачки команд в Битрикс24: {e}")
+
+            results = (batch_result or {}).get("result", {})
+            errors = (batch_result or {}).get("result_error", {})
+
+            for index, (_, _, future) in enumerate(pending):
+                if future.done():
+                    continue
+
+                key = str(index)
+                if batch_result is None:
+                    future.set_result({
+                        "error": "BATCH_FAILED",
+                        "error_description": "Пакетный запрос batch не выполнен",
+                    })
+                elif key in errors:
+                    error = errors[key]
+                    future.set_result(error if isinstance(error, dict) else {"error": error})
+                else:
+                    future.set_result({"result": results.get(key)})
+        finally:
+            # При отмене посреди batch (aclose) команды уже вне очереди —
+            # без этого ожидающие submit() зависли бы навсегда
+            self._close_pending(pending)
+
+    @staticmethod
+    def _close_pending(pending: list[tuple[str, dict, asyncio.Future]]) -> None:
+        """Завершение ещё не разрешённых команд ошибкой BATCH_CLOSED."""
+        for _, _, future in pending:
+            if not future.done():
+                future.set_result({
+                    "error": "BATCH_CLOSED",
+                    "error_description": "Клиент Битрикс24 остановлен",
+                })
+
+    async def aclose(self) -> None:
+        """Остановка фонового цикла; ожидающие команды завершаются ошибкой."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        # Отменённые пачки разрешают свои команды ошибкой BATCH_CLOSED в _flush
+        flushes = list(self._flushes)
+        for flush in flushes:
+            flush.cancel()
+        await asyncio.gather(*flushes, return_exceptions=True)
+
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._close_pending(pending)
+
+
+def _require_webhook(default: Any = None, warning: Optional[str] = None):
+    """
+    Декоратор метода Bitrix24Client: если вебхук не настроен,
+    метод не выполняется и возвращает default (с предупреждением в лог).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self: "Bitrix24Client", *args, **kwargs):
+            if not self._enabled:
+                if warning:
+                    logger.warning(warning)
+                return default
+            return await func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class Bitrix24Client:
     """
     Клиент для взаимодействия с REST API Битрикс24.
@@ -41,6 +248,24 @@ class Bitrix24Client:
     }
     APPOINTMENT_DATETIME_FIELD = "UF_CRM_1665031646808"
     DEFAULT_PORTAL_CLINIC_BUCKET = "test"
+    # Ограничение Битрикс24 на число команд в одном вызове batch
+    BATCH_MAX_COMMANDS = 50
+    # Кэш сделок/контактов: за одно завершение опроса сделка читается 2–3 раза
+    ENTITY_CACHE_MAXSIZE = 2048
+    ENTITY_CACHE_TTL_SECONDS = 60
+    # Методы REST API, для которых URL собирается заранее в __init__
+    REST_METHODS = (
+        "batch",
+        "crm.activity.add",
+        "crm.contact.get",
+        "crm.deal.fields",
+        "crm.deal.get",
+        "crm.deal.update",
+        "crm.lead.update",
+        "crm.timeline.comment.add",
+        "disk.folder.uploadfile",
+        "user.get",
+    )
 
     def __init__(self, webhook_url: Optional[str] = None):
         """
@@ -49,9 +274,151 @@ class Bitrix24Client:
         Args:
             webhook_url: URL входящего вебхука (если не указан, берётся из settings)
         """
-        self.webhook_url = webhook_url or settings.BITRIX24_WEBHOOK_URL
+        self.webhook_url = (webhook_url or settings.BITRIX24_WEBHOOK_URL or "").rstrip("/")
+        self._enabled = bool(self.webhook_url)
+        # URL методов считаются один раз, а не на каждом вызове
+        self._urls = {method: f"{self.webhook_url}/{method}" for method in self.REST_METHODS}
         self.timeout = 30.0
+        # Постоянный HTTP-клиент: переиспользует TCP/TLS-соединения между вызовами
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+        # Кэш прочитанных сущностей: ключ ("deal" | "contact", id)
+        self._entity_cache: TTLCache = TTLCache(
+            maxsize=self.ENTITY_CACHE_MAXSIZE,
+            ttl=self.ENTITY_CACHE_TTL_SECONDS,
+        )
+        # Запросы чтения в полёте: одинаковые параллельные чтения ждут один HTTP-вызов
+        self._inflight: dict[tuple[str, int], asyncio.Task] = {}
+        # Ограничение частоты запросов (None — без ограничения)
+        self._rate_limiter: Optional[Bitrix24RateLimiter] = None
+        if settings.BITRIX24_RATE_LIMIT_PER_SECOND > 0:
+            self._rate_limiter = Bitrix24RateLimiter(
+                rate=settings.BITRIX24_RATE_LIMIT_PER_SECOND,
+                burst=settings.BITRIX24_RATE_LIMIT_BURST,
+            )
+        # Очередь коалесцирования записей (None — отправка без очереди)
+        self._batcher: Optional[Bitrix24Batcher] = None
+        if settings.BITRIX24_BATCH_MAX_WAIT_MS > 0:
+            self._batcher = Bitrix24Batcher(
+                self,
+                max_batch=settings.BITRIX24_BATCH_MAX_SIZE,
+                max_wait_ms=settings.BITRIX24_BATCH_MAX_WAIT_MS,
+            )
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Ленивое создание общего httpx.AsyncClient (keep-alive пул соединений)."""
+        if self._client is None or self._client.is_closed:
+            async with self._client_lock:
+                if self._client is None or self._client.is_closed:
+                    http2 = settings.BITRIX24_HTTP2 and _H2_AVAILABLE
+                    if settings.BITRIX24_HTTP2 and not _H2_AVAILABLE:
+                        logger.warning("Пакет h2 не установлен, запросы к Битрикс24 идут по HTTP/1.1")
+                    # HTTP/2 мультиплексирует параллельные вызовы в одном TLS-соединении
+                    self._client = httpx.AsyncClient(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                        http2=http2,
+                    )
+        return self._client
+
+    async def _post_json(self, method: str, payload: dict) -> Optional[dict]:
+        """
+        POST-запрос метода REST API с сериализацией через orjson.
+
+        Тело кодируется и разбирается orjson напрямую из bytes, минуя
+        stdlib json и промежуточное декодирование в str.
+        Ответы 429/503 повторяются для любых методов, 500/502/504 — только
+        для методов чтения; паузы растут экспоненциально с джиттером.
+
+        Returns:
+            Разобранный ответ или None, если запрос не удался
+            (ошибка уже записана в лог)
+        """
+        try:
+            client = await self._get_client()
+            url = self._urls.get(method) or f"{self.webhook_url}/{method}"
+            content = orjson.dumps(payload)
+            max_retries = max(0, settings.BITRIX24_MAX_RETRIES)
+
+            for attempt in range(max_retries + 1):
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.acquire()
+
+                response = await client.post(url, content=content, headers=JSON_HEADERS)
+
+                if attempt < max_retries and self._is_retryable(method, response.status_code):
+                    delay = self._retry_delay(attempt)
+                    logger.warning(
+                        f"Битрикс24 ответил {response.status_code} на {method}, "
+                        f"повтор {attempt + 1}/{max_retries} через {delay:.2f} с"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+
+                response.raise_for_status()
+                result = orjson.loads(response.content)
+                if not isinstance(result, dict):
+                    logger.error(f"Неожиданный ответ Битрикс24 на {method}: {type(result).__name__}")
+                    return None
+                return result
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP ошибка Битрикс24 при вызове {method}: {e}")
+        except httpx.RequestError as e:
+            logger.error(f"Ошибка соединения с Битрикс24 при вызове {method}: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Некорректный JSON в ответе Битрикс24 на {method}: {e}")
+        except Exception as e:
+            # Например, несериализуемое значение в payload или некорректный URL вебхука:
+            # вызывающий код по-прежнему получает None, а не исключение
+            logger.error(f"Неожиданная ошибка при вызове {method} Битрикс24: {e}")
+        return None
+
+    @staticmethod
+    def _is_read_method(method: str) -> bool:
+        """Метод только читает данные и его повтор не создаёт дублей."""
+        return method == "user.get" or method.endswith((".get", ".fields", ".list"))
+
+    @classmethod
+    def _is_retryable(cls, method: str, status_code: int) -> bool:
+        """Можно ли повторить запрос после ответа с данным статусом."""
+        if status_code in RETRY_ALWAYS_STATUSES:
+            return True
+        return status_code in RETRY_READ_ONLY_STATUSES and cls._is_read_method(method)
+
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        """Пауза перед повтором: 1, 2, 4… с, не больше RETRY_MAX_DELAY_SECONDS, плюс джиттер."""
+        return min(2 ** attempt, RETRY_MAX_DELAY_SECONDS) + random.random() * 0.2
+
+    async def _submit(self, method: str, payload: dict, direct: bool = False) -> dict:
+        """
+        Вызов метода на запись: через очередь batch, если она включена,
+        иначе отдельным HTTP-запросом.
+
+        direct=True отправляет вызов сразу, минуя очередь, — для записей,
+        результат которых нужен немедленно (например, в ответе вебхука).
+        """
+        if self._batcher is not None and not direct:
+            return await self._batcher.submit(method, payload)
+
+        result = await self._post_json(method, payload)
+        if result is None:
+            return {
+                "error": "REQUEST_FAILED",
+                "error_description": f"Запрос {method} к Битрикс24 не выполнен",
+            }
+        return result
+
+    async def aclose(self) -> None:
+        """Закрытие пула соединений (вызывается при остановке приложения)."""
+        if self._batcher is not None:
+            await self._batcher.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
+    @_require_webhook(False, warning="BITRIX24_WEBHOOK_URL не настроен, пропускаем отправку")
     async def send_comment(
         self,
         entity_id: int,
@@ -71,177 +438,154 @@ class Bitrix24Client:
         Returns:
             True если успешно, False при ошибке
         """
-        if not self.webhook_url:
-            logger.warning("BITRIX24_WEBHOOK_URL не настроен, пропускаем отправку")
-            return False
-        
-        # Формирование URL метода
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.timeline.comment.add"
-        
-        # Параметры запроса
-        # Битрикс24 использует числовые коды для типов сущностей
-        entity_type_map = {
-            "DEAL": "deal",
-            "LEAD": "lead",
-        }
-        
         entity_type_normalized = (entity_type or "DEAL").upper()
-        if entity_type_normalized not in entity_type_map:
+        if entity_type_normalized not in _ENTITY_TYPE_MAP:
             entity_type_normalized = "DEAL"
 
         payload = {
             "fields": {
                 "ENTITY_ID": entity_id,
-                "ENTITY_TYPE": entity_type_map[entity_type_normalized],
+                "ENTITY_TYPE": _ENTITY_TYPE_MAP[entity_type_normalized],
                 "COMMENT": comment,
             }
         }
         
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-
-                if "error" in result:
-                    error = result.get("error_description", result.get("error", "Неизвестная ошибка"))
-                    logger.error(
-                        f"Ошибка Битрикс24 при добавлении комментария: {error} "
-                        f"(error={result.get('error')}, entity_type={entity_type_normalized}, entity_id={entity_id})"
-                    )
-                    return False
+        result = await self._submit("crm.timeline.comment.add", payload)
 
-                raw_result = result.get("result")
-                if isinstance(raw_result, int) and raw_result > 0:
-                    logger.info(
-                        f"Комментарий отправлен в Битрикс24: "
-                        f"comment_id={raw_result}, entity_type={entity_type_normalized}, entity_id={entity_id}"
-                    )
-                    return True
-
-                logger.warning(
-                    "Неожиданный ответ Bitrix crm.timeline.comment.add: "
-                    f"result={raw_result!r} (type={type(raw_result).__name__}), "
-                    f"entity_type={entity_type_normalized}, entity_id={entity_id}, response={result}"
-                )
-                return False
-                    
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP ошибка при отправке в Битрикс24: {e}")
-            return False
-        except httpx.RequestError as e:
-            logger.error(f"Ошибка соединения с Битрикс24: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка при отправке в Битрикс24: {e}")
+        if "error" in result:
+            error = result.get("error_description", result.get("error", "Неизвестная ошибка"))
+            logger.error(
+                f"Ошибка Битрикс24 при добавлении комментария: {error} "
+                f"(error={result.get('error')}, entity_type={entity_type_normalized}, entity_id={entity_id})"
+            )
             return False
+
+        raw_result = result.get("result")
+        if isinstance(raw_result, int) and raw_result > 0:
+            logger.opt(lazy=True).info(
+                "Комментарий отправлен в Битрикс24: comment_id={}, entity_type={}, entity_id={}",
+                lambda: raw_result,
+                lambda: entity_type_normalized,
+                lambda: entity_id,
+            )
+            return True
+
+        logger.warning(
+            "Неожиданный ответ Bitrix crm.timeline.comment.add: "
+            f"result={raw_result!r} (type={type(raw_result).__name__}), "
+            f"entity_type={entity_type_normalized}, entity_id={entity_id}"
+        )
+        return False
     
     async def update_deal_field(
         self,
         deal_id: int,
         fields: dict,
+        direct: bool = False,
     ) -> bool:
         """
-        Обновление полей сделки.
-        
-        Метод API: crm.deal.update
-        
-        Args:
-            deal_id: ID сделки
-            fields: Словарь полей для обновления
-            
+        Обновление полей сделки (метод API: crm.deal.update).
+
         Returns:
             True если успешно
         """
-        if not self.webhook_url:
-            logger.warning("BITRIX24_WEBHOOK_URL не настроен")
-            return False
-        
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.deal.update"
-        
-        payload = {
-            "id": deal_id,
-            "fields": fields,
-        }
-        
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-                return result.get("result", False)
-                
-        except Exception as e:
-            logger.error(f"Ошибка обновления сделки в Битрикс24: {e}")
-            return False
+        return await self.update_entity_field(
+            entity_id=deal_id, entity_type="DEAL", fields=fields, direct=direct
+        )
 
     async def update_lead_field(
         self,
         lead_id: int,
         fields: dict,
+        direct: bool = False,
     ) -> bool:
         """
-        Обновление полей лида.
-
-        Метод API: crm.lead.update
-
-        Args:
-            lead_id: ID лида
-            fields: Словарь полей для обновления
+        Обновление полей лида (метод API: crm.lead.update).
 
         Returns:
             True если успешно
         """
-        if not self.webhook_url:
-            logger.warning("BITRIX24_WEBHOOK_URL не настроен")
-            return False
-
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.lead.update"
-
-        payload = {
-            "id": lead_id,
-            "fields": fields,
-        }
-
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-
-                result = response.json()
-                return bool(result.get("result", False))
-
-        except Exception as e:
-            logger.error(f"Ошибка обновления лида в Битрикс24: {e}")
-            return False
+        return await self.update_entity_field(
+            entity_id=lead_id, entity_type="LEAD", fields=fields, direct=direct
+        )
 
+    @_require_webhook(False, warning="BITRIX24_WEBHOOK_URL не настроен")
     async def update_entity_field(
         self,
         entity_id: int,
         entity_type: str,
         fields: dict,
+        direct: bool = False,
     ) -> bool:
         """
         Универсальное обновление полей сущности (сделка или лид).
 
-        Маршрутизирует вызов на crm.deal.update или crm.lead.update
-        в зависимости от типа сущности.
+        Метод API выбирается по типу сущности из _ENTITY_UPDATE_METHODS:
+        crm.lead.update для лида, crm.deal.update для остальных.
 
         Args:
             entity_id: ID сделки или лида
             entity_type: Тип сущности ('DEAL' или 'LEAD')
             fields: Словарь полей для обновления
+            direct: Отправить сразу, минуя очередь batch
 
         Returns:
             True если успешно
         """
         entity_type_upper = (entity_type or "DEAL").upper()
-        if entity_type_upper == "LEAD":
-            return await self.update_lead_field(lead_id=entity_id, fields=fields)
-        return await self.update_deal_field(deal_id=entity_id, fields=fields)
+        if entity_type_upper not in _ENTITY_UPDATE_METHODS:
+            entity_type_upper = "DEAL"
+
+        method = _ENTITY_UPDATE_METHODS[entity_type_upper]
+        result = await self._submit(method, {"id": entity_id, "fields": fields}, direct=direct)
+        if "error" in result:
+            logger.error(
+                f"Ошибка Битрикс24 при обновлении полей ({method}, id={entity_id}): "
+                f"{result.get('error_description') or result.get('error')}"
+            )
+            return False
+
+        updated = bool(result.get("result"))
+        if updated and entity_type_upper == "DEAL":
+            self._entity_cache.pop(("deal", int(entity_id)), None)
+        return updated
+
+    def _get_cached_entity(self, entity: str, entity_id: Any) -> Optional[dict]:
+        """Копия сущности из TTL-кэша (вызывающий код может её изменять)."""
+        cached = self._entity_cache.get((entity, int(entity_id)))
+        return dict(cached) if cached is not None else None
+
+    def _cache_entity(self, entity: str, entity_id: Any, data: Any) -> Any:
+        """Сохраняет успешно прочитанную сущность в TTL-кэш и возвращает её копию."""
+        if not isinstance(data, dict):
+            return data
+        self._entity_cache[(entity, int(entity_id))] = data
+        return dict(data)
+
+    async def _fetch_entity(self, entity: str, method: str, entity_id: Any) -> Any:
+        """
+        Чтение сущности с объединением одинаковых параллельных запросов.
 
+        Если такой же запрос уже выполняется, ожидается его результат
+        вместо нового HTTP-вызова (single-flight). Ошибка запроса
+        записывается в лог один раз, все ожидающие получают None.
+        """
+        key = (entity, int(entity_id))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._post_json(method, {"id": entity_id}))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._release_inflight(key, done))
+
+        # shield: отмена одного ожидающего не отменяет запрос для остальных
+        result = await asyncio.shield(task)
+        return self._cache_entity(entity, entity_id, (result or {}).get("result"))
+
+    def _release_inflight(self, key: tuple[str, int], task: asyncio.Task) -> None:
+        """Снятие завершённого запроса из self._inflight."""
+        self._inflight.pop(key, None)
+
+    @_require_webhook()
     async def get_deal(self, deal_id: int) -> Optional[dict]:
         """
         Получение данных сделки.
@@ -254,25 +598,13 @@ class Bitrix24Client:
         Returns:
             Данные сделки или None
         """
-        if not self.webhook_url:
-            return None
-        
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.deal.get"
-        
-        payload = {"id": deal_id}
-        
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-                return result.get("result")
-                
-        except Exception as e:
-            logger.error(f"Ошибка получения сделки из Битрикс24: {e}")
-            return None
+        cached = self._get_cached_entity("deal", deal_id)
+        if cached is not None:
+            return cached
+
+        return await self._fetch_entity("deal", "crm.deal.get", deal_id)
 
+    @_require_webhook()
     async def get_contact(self, contact_id: int) -> Optional[dict]:
         """
         Получение данных контакта.
@@ -285,67 +617,100 @@ class Bitrix24Client:
         Returns:
             Данные контакта или None
         """
-        if not self.webhook_url:
-            return None
-        
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.contact.get"
-        payload = {"id": contact_id}
-        
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-                return response.json().get("result")
-        except Exception as e:
-            logger.error(f"Ошибка получения контакта из Битрикс24: {e}")
-            return None
+        cached = self._get_cached_entity("contact", contact_id)
+        if cached is not None:
+            return cached
+
+        return await self._fetch_entity("contact", "crm.contact.get", contact_id)
 
+    @_require_webhook()
     async def get_user(self, user_id: int) -> Optional[dict]:
         """
         Получение данных сотрудника Bitrix24.
 
         Метод API: user.get
         """
-        if not self.webhook_url:
-            return None
+        result = ((await self._post_json("user.get", {"ID": user_id})) or {}).get("result")
+        if isinstance(result, list):
+            return result[0] if result else None
+        if isinstance(result, dict):
+            return result
+        return None
 
-        method_url = f"{self.webhook_url.rstrip('/')}/user.get"
-        payload = {"ID": user_id}
+    @_require_webhook()
+    async def get_deal_field_definition(self, field_name: str) -> Optional[dict]:
+        """Возвращает метаданные поля сделки из Bitrix24."""
+        result = ((await self._post_json("crm.deal.fields", {})) or {}).get("result")
+        field_definition = result.get(field_name) if isinstance(result, dict) else None
+        return field_definition if isinstance(field_definition, dict) else None
 
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
+    @staticmethod
+    def _flatten_query_params(params: Any, prefix: str = "") -> list[tuple[str, str]]:
+        """Разворачивает вложенные параметры в пары в стиле PHP http_build_query."""
+        if isinstance(params, dict):
+            items = params.items()
+        elif isinstance(params, (list, tuple)):
+            items = enumerate(params)
+        else:
+            return [(prefix, "" if params is None else str(params))]
+
+        flat: list[tuple[str, str]] = []
+        for key, value in items:
+            name = f"{prefix}[{key}]" if prefix else str(key)
+            flat.extend(Bitrix24Client._flatten_query_params(value, name))
+        return flat
+
+    @classmethod
+    def _build_batch_command(cls, method: str, params: dict) -> str:
+        """Формирует строку команды batch: "method?key=value&..."."""
+        query = urlencode(cls._flatten_query_params(params))
+        return f"{method}?{query}" if query else method
+
+    @_require_webhook()
+    async def batch(self, cmd: dict[str, tuple[str, dict]], halt: bool = False) -> Optional[dict]:
+        """
+        Пакетное выполнение нескольких методов REST API одним запросом.
 
-                result = response.json().get("result")
-                if isinstance(result, list):
-                    return result[0] if result else None
-                if isinstance(result, dict):
-                    return result
-                return None
-        except Exception as e:
-            logger.error(f"Ошибка получения сотрудника из Битрикс24: {e}")
-            return None
+        Метод API: batch
 
-    async def get_deal_field_definition(self, field_name: str) -> Optional[dict]:
-        """Возвращает метаданные поля сделки из Bitrix24."""
-        if not self.webhook_url:
-            return None
+        Параметры команд могут ссылаться на результаты предыдущих команд
+        через подстановку вида "$result[deal][CONTACT_ID]".
 
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.deal.fields"
+        Args:
+            cmd: Словарь {ключ: (метод, параметры)}, не более 50 команд
+            halt: Прервать выполнение пакета при первой ошибке
 
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json={})
-                response.raise_for_status()
+        Returns:
+            {"result": {ключ: результат}, "result_error": {ключ: ошибка}} или None
+        """
+        if len(cmd) > self.BATCH_MAX_COMMANDS:
+            raise ValueError(
+                f"batch поддерживает не более {self.BATCH_MAX_COMMANDS} команд, передано {len(cmd)}"
+            )
 
-                result = response.json().get("result", {})
-                field_definition = result.get(field_name)
-                return field_definition if isinstance(field_definition, dict) else None
-        except Exception as e:
-            logger.error(f"Ошибка получения метаданных поля сделки из Битрикс24: {e}")
+        payload = {
+            "halt": 1 if halt else 0,
+            "cmd": {
+                key: self._build_batch_command(method, params)
+                for key, (method, params) in cmd.items()
+            },
+        }
+
+        response = await self._post_json("batch", payload)
+        if response is None:
             return None
 
+        batch_result = response.get("result")
+        if not isinstance(batch_result, dict):
+            batch_result = {}
+        # PHP сериализует пустой ассоциативный массив как [], нормализуем в dict
+        results = batch_result.get("result") or {}
+        errors = batch_result.get("result_error") or {}
+        return {
+            "result": results if isinstance(results, dict) else {},
+            "result_error": errors if isinstance(errors, dict) else {},
+        }
+
     @staticmethod
     def _extract_first_scalar(value: Any) -> Any:
         """Возвращает первое скалярное значение из поля Bitrix, если оно вложено."""
@@ -431,30 +796,59 @@ class Bitrix24Client:
 
         return None
 
-    async def get_patient_name_from_deal(self, deal_id: int) -> Optional[str]:
+    async def get_patient_name_from_deal(
+        self,
+        deal_id: int,
+        contact_id: Optional[int] = None,
+    ) -> Optional[str]:
         """
         Получение ФИО пациента (контакта) из сделки.
         
-        1. Получаем сделку → берём CONTACT_ID
-        2. Получаем контакт → берём LAST_NAME + NAME + SECOND_NAME (Фамилия Имя Отчество)
+        Сделка и контакт запрашиваются одним вызовом batch:
+        1. crm.deal.get → берём CONTACT_ID
+        2. crm.contact.get с подстановкой $result[deal][CONTACT_ID]
+           → берём LAST_NAME + NAME + SECOND_NAME (Фамилия Имя Отчество)
+        
+        Если вызывающий код уже получил сделку и передал contact_id
+        (или сделка есть в кэше), запрос сделки пропускается и загружается
+        только контакт.
         
         Args:
             deal_id: ID сделки
+            contact_id: CONTACT_ID из уже загруженной сделки (необязательно)
             
         Returns:
             ФИО контакта или None
         """
-        deal = await self.get_deal(deal_id)
-        if not deal:
-            logger.warning(f"Не удалось получить сделку {deal_id} для извлечения имени")
-            return None
-        
-        contact_id = deal.get("CONTACT_ID")
         if not contact_id:
-            logger.warning(f"В сделке {deal_id} не указан контакт (CONTACT_ID)")
-            return None
-        
-        contact = await self.get_contact(int(contact_id))
+            cached_deal = self._get_cached_entity("deal", deal_id)
+            if cached_deal is not None:
+                contact_id = cached_deal.get("CONTACT_ID")
+                if not contact_id:
+                    logger.warning(f"В сделке {deal_id} не указан контакт (CONTACT_ID)")
+                    return None
+
+        if contact_id:
+            contact = await self.get_contact(int(contact_id))
+        else:
+            batch_result = await self.batch({
+                "deal": ("crm.deal.get", {"id": deal_id}),
+                "contact": ("crm.contact.get", {"id": "$result[deal][CONTACT_ID]"}),
+            })
+            results = (batch_result or {}).get("result", {})
+
+            deal = self._cache_entity("deal", deal_id, results.get("deal"))
+            if not deal:
+                logger.warning(f"Не удалось получить сделку {deal_id} для извлечения имени")
+                return None
+
+            contact_id = deal.get("CONTACT_ID")
+            if not contact_id:
+                logger.warning(f"В сделке {deal_id} не указан контакт (CONTACT_ID)")
+                return None
+
+            contact = self._cache_entity("contact", contact_id, results.get("contact"))
+
         if not contact:
             logger.warning(f"Не удалось получить контакт {contact_id}")
             return None
@@ -465,7 +859,11 @@ class Bitrix24Client:
         full_name = " ".join(part for part in [last_name, name, second_name] if part)
         
         if full_name:
-            logger.info(f"Имя пациента из Битрикс24: {mask_name(full_name)} (сделка {deal_id})")
+            logger.opt(lazy=True).info(
+                "Имя пациента из Битрикс24: {} (сделка {})",
+                lambda: mask_name(full_name),
+                lambda: deal_id,
+            )
         
         return full_name or None
 
@@ -586,6 +984,7 @@ class Bitrix24Client:
 
         return doctor_name
 
+    @_require_webhook(False, warning="BITRIX24_WEBHOOK_URL не настроен, пропускаем загрузку PDF")
     async def upload_pdf_to_entity(
         self,
         entity_id: int,
@@ -594,15 +993,14 @@ class Bitrix24Client:
         filename: str,
     ) -> bool:
         """
-        Загрузка PDF-отчёта в карточку сделки/лида через crm.timeline.comment.add
-        с вложенным файлом (base64).
-        
-        Альтернативный подход: загрузка через disk.folder.uploadfile
-        и прикрепление через crm.deal.update (UF_CRM_xxx).
+        Загрузка PDF-отчёта в карточку сделки/лида.
         
-        Здесь используем наиболее универсальный метод:
-        1. Загрузка файла через REST (crm.activity.add с STORAGE_TYPE_DISK)
-        2. Или через комментарий с base64-вложением
+        Порядок попыток:
+        1. Если задан BITRIX24_DISK_FOLDER_ID — потоковая загрузка файла на диск
+           (disk.folder.uploadfile, multipart/form-data без base64) и создание
+           дела со ссылкой на файл диска
+        2. Создание дела (crm.activity.add) с base64-вложением
+        3. Комментарий в таймлайне с base64-вложением
         
         Args:
             entity_id: ID сделки или лида
@@ -613,12 +1011,20 @@ class Bitrix24Client:
         Returns:
             True если успешно, False при ошибке
         """
-        if not self.webhook_url:
-            logger.warning("BITRIX24_WEBHOOK_URL не настроен, пропускаем загрузку PDF")
-            return False
+        # Метод 0: multipart-загрузка на диск без раздувания base64
+        if settings.BITRIX24_DISK_FOLDER_ID:
+            success = await self._upload_via_disk(
+                entity_id=entity_id,
+                entity_type=entity_type,
+                pdf_bytes=pdf_bytes,
+                filename=filename,
+            )
+            if success:
+                return True
+            logger.warning("Не удалось загрузить PDF на диск Битрикс24, пробуем через base64-вложение")
         
-        # Кодируем PDF в base64
-        pdf_base64 = base64.b64encode(pdf_bytes).decode("utf-8")
+        # Кодируем PDF в base64 в пуле потоков, чтобы не блокировать event loop
+        pdf_base64 = await asyncio.to_thread(self._encode_base64, pdf_bytes)
         
         # Метод 1: Создание дела (активности) с файлом
         success = await self._upload_via_activity(
@@ -640,6 +1046,100 @@ class Bitrix24Client:
             filename=filename,
         )
     
+    @staticmethod
+    def _encode_base64(data: bytes) -> str:
+        """Base64 без лишней копии буфера; алфавит base64 — чистый ASCII."""
+        return base64.b64encode(memoryview(data)).decode("ascii")
+
+    @staticmethod
+    def _build_report_activity_fields(entity_id: int, entity_type: str) -> dict:
+        """Общие поля дела «Результаты опроса пациента» для загрузки PDF."""
+        return {
+            "OWNER_TYPE_ID": _ENTITY_OWNER_TYPE_ID.get((entity_type or "DEAL").upper(), 1),
+            "OWNER_ID": entity_id,
+            "TYPE_ID": 4,  # 4 = Email (позволяет прикреплять файлы)
+            "SUBJECT": "Результаты опроса пациента",
+            "DESCRIPTION": (
+                "Пациент завершил прохождение опроса. "
+                "PDF-отчёт с результатами прикреплён к этому делу."
+            ),
+            "DESCRIPTION_TYPE": 1,  # 1 = Plain text
+            "DIRECTION": 2,  # 2 = Исходящее
+            "COMPLETED": "Y",
+            "RESPONSIBLE_ID": 1,  # Ответственный (по умолчанию - ID=1)
+        }
+
+    async def _upload_via_disk(
+        self,
+        entity_id: int,
+        entity_type: str,
+        pdf_bytes: bytes,
+        filename: str,
+    ) -> bool:
+        """
+        Загрузка PDF на диск Битрикс24 через multipart/form-data.
+        
+        1. disk.folder.uploadfile без fileContent → uploadUrl и имя поля
+        2. POST multipart на uploadUrl (файл передаётся потоком, без base64)
+        3. crm.activity.add с вложением файла диска (STORAGE_TYPE_ID = 3)
+        """
+        try:
+            upload_target = (
+                await self._post_json(
+                    "disk.folder.uploadfile", {"id": settings.BITRIX24_DISK_FOLDER_ID}
+                )
+                or {}
+            ).get("result") or {}
+            
+            upload_url = upload_target.get("uploadUrl")
+            field_name = upload_target.get("field") or "file"
+            if not upload_url:
+                logger.error(f"Битрикс24 не вернул uploadUrl для загрузки PDF: {upload_target}")
+                return False
+            
+            client = await self._get_client()
+            # Файловый объект httpx отправляет кусками по 64 КБ, не собирая
+            # всё multipart-тело в отдельный буфер; BytesIO не копирует bytes
+            response = await client.post(
+                upload_url,
+                files={field_name: (filename, io.BytesIO(pdf_bytes), "application/pdf")},
+            )
+            response.raise_for_status()
+            file_id = (orjson.loads(response.content).get("result") or {}).get("ID")
+            if not file_id:
+                logger.error("Битрикс24 не вернул ID загруженного на диск PDF")
+                return False
+            
+            fields = self._build_report_activity_fields(entity_id, entity_type)
+            fields["STORAGE_TYPE_ID"] = 3  # 3 = файл диска Битрикс24
+            fields["STORAGE_ELEMENT_IDS"] = [int(file_id)]
+            
+            result = await self._submit("crm.activity.add", {"fields": fields})
+            if result.get("result"):
+                logger.opt(lazy=True).info(
+                    "PDF загружен на диск Битрикс24 и прикреплён к делу: "
+                    "activity_id={}, file_id={}, entity_type={}, entity_id={}",
+                    lambda: result["result"],
+                    lambda: file_id,
+                    lambda: entity_type,
+                    lambda: entity_id,
+                )
+                return True
+            
+            error = result.get("error_description", result.get("error", "Неизвестная ошибка"))
+            logger.error(f"Ошибка создания дела с файлом диска: {error}")
+            return False
+        
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP ошибка при загрузке PDF на диск Битрикс24: {e}")
+            return False
+        except httpx.RequestError as e:
+            logger.error(f"Ошибка соединения при загрузке PDF на диск Битрикс24: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Неожиданная ошибка при загрузке PDF на диск Битрикс24: {e}")
+            return False
+    
     async def _upload_via_activity(
         self,
         entity_id: int,
@@ -653,62 +1153,33 @@ class Bitrix24Client:
         Этот метод создаёт «Дело» (активность) в карточке сделки/лида
         с прикреплённым PDF-файлом. Файл будет виден в ленте и во вкладке «Дела».
         """
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.activity.add"
-        
-        # Маппинг типов сущностей в ID Битрикс24
-        owner_type_id = 2 if entity_type.upper() == "DEAL" else 1  # 2=DEAL, 1=LEAD
-        
-        payload = {
-            "fields": {
-                "OWNER_TYPE_ID": owner_type_id,
-                "OWNER_ID": entity_id,
-                "TYPE_ID": 4,  # 4 = Email (позволяет прикреплять файлы)
-                "SUBJECT": "Результаты опроса пациента",
-                "DESCRIPTION": (
-                    "Пациент завершил прохождение опроса. "
-                    "PDF-отчёт с результатами прикреплён к этому делу."
-                ),
-                "DESCRIPTION_TYPE": 1,  # 1 = Plain text
-                "DIRECTION": 2,  # 2 = Исходящее
-                "COMPLETED": "Y",
-                "RESPONSIBLE_ID": 1,  # Ответственный (по умолчанию - ID=1)
-                "FILES": [
-                    {
-                        "fileData": [filename, pdf_base64],
-                    }
-                ],
+        fields = self._build_report_activity_fields(entity_id, entity_type)
+        fields["FILES"] = [
+            {
+                "fileData": [filename, pdf_base64],
             }
-        }
+        ]
+        payload = {"fields": fields}
         
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                if result.get("result"):
-                    activity_id = result["result"]
-                    logger.info(
-                        f"PDF загружен через активность в Битрикс24: "
-                        f"activity_id={activity_id}, entity_type={entity_type}, "
-                        f"entity_id={entity_id}, filename={filename}"
-                    )
-                    return True
-                else:
-                    error = result.get("error_description", "Неизвестная ошибка")
-                    logger.error(f"Ошибка загрузки PDF через активность: {error}")
-                    return False
-                    
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP ошибка при загрузке PDF через активность: {e}")
-            return False
-        except httpx.RequestError as e:
-            logger.error(f"Ошибка соединения при загрузке PDF: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка при загрузке PDF через активность: {e}")
+        result = await self._post_json("crm.activity.add", payload)
+        if result is None:
             return False
+
+        if result.get("result"):
+            activity_id = result["result"]
+            logger.opt(lazy=True).info(
+                "PDF загружен через активность в Битрикс24: "
+                "activity_id={}, entity_type={}, entity_id={}, filename={}",
+                lambda: activity_id,
+                lambda: entity_type,
+                lambda: entity_id,
+                lambda: filename,
+            )
+            return True
+
+        error = result.get("error_description", "Неизвестная ошибка")
+        logger.error(f"Ошибка загрузки PDF через активность: {error}")
+        return False
     
     async def _upload_via_comment_with_file(
         self,
@@ -723,17 +1194,10 @@ class Bitrix24Client:
         Fallback-метод: если crm.activity.add не работает,
         добавляем комментарий с base64-файлом.
         """
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.timeline.comment.add"
-        
-        entity_type_map = {
-            "DEAL": "deal",
-            "LEAD": "lead",
-        }
-        
         payload = {
             "fields": {
                 "ENTITY_ID": entity_id,
-                "ENTITY_TYPE": entity_type_map.get(entity_type.upper(), "deal"),
+                "ENTITY_TYPE": _ENTITY_TYPE_MAP.get((entity_type or "DEAL").upper(), "deal"),
                 "COMMENT": (
                     f"Результаты опроса пациента.\n"
                     f"PDF-отчёт прикреплён к этому комментарию: {filename}"
@@ -744,28 +1208,23 @@ class Bitrix24Client:
             }
         }
         
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                if result.get("result"):
-                    logger.info(
-                        f"PDF загружен через комментарий в Битрикс24: "
-                        f"entity_type={entity_type}, entity_id={entity_id}"
-                    )
-                    return True
-                else:
-                    error = result.get("error_description", "Неизвестная ошибка")
-                    logger.error(f"Ошибка загрузки PDF через комментарий: {error}")
-                    return False
-                    
-        except Exception as e:
-            logger.error(f"Ошибка загрузки PDF через комментарий: {e}")
+        result = await self._post_json("crm.timeline.comment.add", payload)
+        if result is None:
             return False
+
+        if result.get("result"):
+            logger.opt(lazy=True).info(
+                "PDF загружен через комментарий в Битрикс24: entity_type={}, entity_id={}",
+                lambda: entity_type,
+                lambda: entity_id,
+            )
+            return True
+
+        error = result.get("error_description", "Неизвестная ошибка")
+        logger.error(f"Ошибка загрузки PDF через комментарий: {error}")
+        return False
     
+    @_require_webhook(False, warning="BITRIX24_WEBHOOK_URL не настроен, пропускаем создание дела")
     async def create_deal_activity(
         self,
         entity_id: int,
@@ -791,13 +1250,8 @@ class Bitrix24Client:
         Returns:
             True если дело создано, False при ошибке
         """
-        if not self.webhook_url:
-            logger.warning("BITRIX24_WEBHOOK_URL не настроен, пропускаем создание дела")
-            return False
-
         entity_type_upper = (entity_type or "DEAL").upper()
-        # OWNER_TYPE_ID: 2 = DEAL, 1 = LEAD
-        owner_type_id = 2 if entity_type_upper == "DEAL" else 1
+        owner_type_id = _ENTITY_OWNER_TYPE_ID.get(entity_type_upper, 1)
 
         # Получаем ответственного из сделки (ASSIGNED_BY_ID)
         if responsible_id is None and entity_type_upper == "DEAL":
@@ -826,12 +1280,9 @@ class Bitrix24Client:
                 )
 
         # Срок выполнения: сегодня 23:59:59 по Europe/Moscow
-        moscow_tz = ZoneInfo("Europe/Moscow")
-        today = datetime.now(tz=moscow_tz).date()
-        deadline_dt = datetime(today.year, today.month, today.day, 23, 59, 59, tzinfo=moscow_tz)
-        deadline_str = deadline_dt.strftime("%Y-%m-%d %H:%M:%S")
-
-        method_url = f"{self.webhook_url.rstrip('/')}/crm.activity.add"
+        deadline_dt = datetime.now(_MOSCOW_TZ).replace(hour=23, minute=59, second=59, microsecond=0)
+        # isoformat без смещения даёт тот же формат "YYYY-MM-DD HH:MM:SS", что и strftime
+        deadline_str = deadline_dt.isoformat(sep=" ", timespec="seconds")[:19]
 
         fields: dict = {
             "OWNER_TYPE_ID": owner_type_id,
@@ -852,41 +1303,26 @@ class Bitrix24Client:
 
         payload = {"fields": fields}
 
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(method_url, json=payload)
-                response.raise_for_status()
+        result = await self._submit("crm.activity.add", payload)
 
-                result = response.json()
+        if result.get("result"):
+            activity_id = result["result"]
+            logger.opt(lazy=True).info(
+                "Дело создано в Битрикс24: activity_id={}, entity_type={}, entity_id={}, deadline={}",
+                lambda: activity_id,
+                lambda: entity_type_upper,
+                lambda: entity_id,
+                lambda: deadline_str,
+            )
+            return True
 
-                if result.get("result"):
-                    activity_id = result["result"]
-                    logger.info(
-                        f"Дело создано в Битрикс24: activity_id={activity_id}, "
-                        f"entity_type={entity_type_upper}, entity_id={entity_id}, "
-                        f"deadline={deadline_str}"
-                    )
-                    return True
+        error = result.get("error_description", result.get("error", "Неизвестная ошибка"))
+        logger.error(
+            f"Ошибка создания дела в Битрикс24 (crm.activity.add): {error} "
+            f"(entity_id={entity_id})"
+        )
+        return False
 
-                error = result.get("error_description", result.get("error", "Неизвестная ошибка"))
-                logger.error(
-                    f"Ошибка создания дела в Битрикс24 (crm.activity.add): {error} "
-                    f"(entity_id={entity_id}, response={result})"
-                )
-                return False
 
-        except httpx.HTTPStatusError as e:
-            logger.error(
-                f"HTTP ошибка при создании дела в Битрикс24: {e} (entity_id={entity_id})"
-            )
-            return False
-        except httpx.RequestError as e:
-            logger.error(
-                f"Ошибка соединения при создании дела в Битрикс24: {e} (entity_id={entity_id})"
-            )
-            return False
-        except Exception as e:
-            logger.error(
-                f"Неожиданная ошибка при создании дела в Битрикс24: {e} (entity_id={entity_id})"
-            )
-            return False
+# Глобальный экземпляр клиента (общий пул соединений для всего приложения)
+bitrix24_client = Bitrix24Client()
@@ -7,7 +7,361 @@
 """
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from html import escape as _html_escape
+from types import MappingProxyType
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional
+
+
+# Общая пустая заглушка для отсутствующих ответов: .get("x") or _EMPTY_ANSWER
+# не создаёт новый словарь на каждый вызов и защищена от изменений
+_EMPTY_ANSWER: Mapping[str, Any] = MappingProxyType({})
+
+
+# Статические стили читаемого отчёта v1. Хранятся обычной строкой, а не
+# частью f-строки: шаблон не пересобирается на каждый отчёт.
+_REPORT_CSS = """\
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            background: #f5f5f5;
+            padding: 20px;
+        }
+        
+        .container {
+            max-width: 900px;
+            margin: 0 auto;
+            background: white;
+            padding: 40px;
+            border-radius: 12px;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+        }
+        
+        .header {
+            border-bottom: 3px solid #2563eb;
+            padding-bottom: 20px;
+            margin-bottom: 30px;
+        }
+        
+        .header h1 {
+            font-size: 28px;
+            color: #1e293b;
+            margin-bottom: 8px;
+        }
+        
+        .subtitle {
+            font-size: 16px;
+            color: #64748b;
+            margin-bottom: 15px;
+        }
+        
+        .patient-info {
+            display: flex;
+            gap: 30px;
+            font-size: 15px;
+            color: #334155;
+        }
+        
+        .section {
+            margin-bottom: 30px;
+            padding: 20px;
+            background: #f8fafc;
+            border-radius: 8px;
+            border-left: 4px solid #3b82f6;
+        }
+        
+        .section h2 {
+            font-size: 20px;
+            color: #1e293b;
+            margin-bottom: 15px;
+            display: flex;
+            align-items: center;
+            gap: 8px;
+        }
+        
+        .section h3 {
+            font-size: 17px;
+            color: #334155;
+            margin-top: 15px;
+            margin-bottom: 10px;
+        }
+        
+        .section p {
+            margin-bottom: 8px;
+            color: #475569;
+        }
+        
+        .section ul {
+            margin-left: 20px;
+            margin-top: 10px;
+        }
+        
+        .section li {
+            margin-bottom: 6px;
+            color: #475569;
+        }
+        
+        .alert-item {
+            background: white;
+            padding: 12px;
+            margin-bottom: 10px;
+            border-radius: 6px;
+            border-left: 3px solid #f59e0b;
+        }
+        
+        .intensity-badge {
+            display: inline-block;
+            padding: 4px 12px;
+            background: #fee2e2;
+            color: #991b1b;
+            border-radius: 4px;
+            font-weight: 600;
+            font-size: 14px;
+        }
+        
+        .risk-badge {
+            display: inline-block;
+            padding: 4px 12px;
+            background: #fef3c7;
+            color: #92400e;
+            border-radius: 4px;
+            font-weight: 600;
+            font-size: 14px;
+            margin-left: 8px;
+        }
+        
+        @media print {
+            body {
+                background: white;
+                padding: 0;
+            }
+            .container {
+                box-shadow: none;
+                padding: 20px;
+            }
+        }
+"""
+
+
+# Статические стили компактного отчёта v2 (один лист А4), обычной строкой —
+# как и _REPORT_CSS.
+_COMPACT_REPORT_CSS = """\
+        @page { size: A4; margin: 8mm 10mm; }
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            font-family: Arial, sans-serif;
+            font-size: 9pt;
+            line-height: 1.6;
+            color: #1a1a1a;
+            background: #fff;
+        }
+        .page {
+            width: 190mm;
+            margin: 0 auto;
+        }
+        /* ── Шапка ── */
+        .report-header {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            border-bottom: 1.5pt solid #1d4ed8;
+            padding-bottom: 5px;
+            margin-bottom: 8px;
+        }
+        .report-header h1 {
+            font-size: 11pt;
+            font-weight: 700;
+            color: #1d4ed8;
+            letter-spacing: 0.3px;
+        }
+        .report-meta {
+            font-size: 8pt;
+            color: #555;
+            text-align: right;
+            line-height: 1.7;
+        }
+        /* ── Блоки ── */
+        .block {
+            border: 0.75pt solid #cbd5e1;
+            border-radius: 4px;
+            margin-bottom: 7px;
+            page-break-inside: avoid;
+        }
+        .block-title {
+            background: #eff6ff;
+            border-bottom: 0.75pt solid #bfdbfe;
+            padding: 4px 8px;
+            font-size: 9pt;
+            font-weight: 700;
+            color: #1e40af;
+            letter-spacing: 0.2px;
+        }
+        .block-body {
+            padding: 5px 8px 6px;
+        }
+        /* ── Подблоки внутри (h2) ── */
+        .block-body h2 {
+            font-size: 8.5pt;
+            font-weight: 700;
+            color: #374151;
+            margin-top: 7px;
+            margin-bottom: 2px;
+            border-bottom: 0.5pt solid #e5e7eb;
+            padding-bottom: 2px;
+        }
+        .block-body h2:first-child { margin-top: 0; }
+        .block-body p {
+            font-size: 8.5pt;
+            margin-bottom: 3px;
+            color: #1a1a1a;
+            line-height: 1.55;
+        }
+        .block-body ul {
+            margin: 2px 0 4px 14px;
+            padding: 0;
+        }
+        .block-body li {
+            font-size: 8.5pt;
+            margin-bottom: 2px;
+            color: #1a1a1a;
+            line-height: 1.55;
+            list-style: disc;
+        }
+        .block-body li.qa-row {
+            list-style: none;
+            display: block;
+            margin-left: -14px;
+            margin-bottom: 5px;
+            padding: 5px 6px 6px;
+            border: 0.75pt solid #e2e8f0;
+            border-radius: 7px;
+            background: linear-gradient(180deg, #ffffff 0%, #f8fbff 100%);
+            box-shadow: 0 1px 0 rgba(148, 163, 184, 0.08);
+            page-break-inside: avoid;
+        }
+        .block-body .qa-kicker {
+            display: inline-block;
+            margin-bottom: 2px;
+            padding: 1px 6px;
+            font-size: 6.7pt;
+            font-weight: 700;
+            letter-spacing: 0.2px;
+            text-transform: uppercase;
+            color: #0f766e;
+            background: #ecfeff;
+            border-radius: 999px;
+        }
+        .block-body .qa-question {
+            display: block;
+            font-size: 8.9pt;
+            font-weight: 400;
+            line-height: 1.42;
+            margin-bottom: 3px;
+            color: #334155;
+            word-break: break-word;
+        }
+        .block-body .qa-answer-kicker {
+            color: #1d4ed8;
+            background: #eff6ff;
+            margin-bottom: 2px;
+        }
+        .block-body .qa-answer {
+            display: block;
+            font-size: 9.8pt;
+            font-weight: 700;
+            line-height: 1.4;
+            text-align: left;
+            padding: 4px 6px;
+            border-radius: 6px;
+            background: #f8fafc;
+            border: 0.75pt solid #dbeafe;
+            color: #0f172a;
+            word-break: break-word;
+        }
+        .block-body .qa-extra {
+            display: block;
+            font-size: 7.8pt;
+            line-height: 1.45;
+            margin-top: 3px;
+            color: #64748b;
+        }
+        /* ── Системный анализ для врача ── */
+        .analysis-block {
+            border: 1.5pt solid #f59e0b;
+            background: #fffbeb;
+            margin-bottom: 8px;
+        }
+        .analysis-block .block-title {
+            background: #fef3c7;
+            border-bottom: 1pt solid #fcd34d;
+            color: #92400e;
+            font-size: 9.5pt;
+        }
+        .analysis-block .block-body ul {
+            margin: 3px 0 3px 16px;
+        }
+        .analysis-block .block-body li {
+            color: #78350f;
+            font-weight: 500;
+            font-size: 8.5pt;
+            margin-bottom: 3px;
+        }
+        /* ── Алерты ── */
+        .alert-block {
+            background: #fff7ed;
+            border: 0.75pt solid #fed7aa;
+        }
+        .alert-block .block-title {
+            background: #fff7ed;
+            border-bottom-color: #fed7aa;
+            color: #9a3412;
+        }
+        .alert-item {
+            background: #fff;
+            border-left: 2pt solid #f59e0b;
+            padding: 4px 7px;
+            margin-bottom: 4px;
+            font-size: 8pt;
+            line-height: 1.5;
+            border-radius: 0 2px 2px 0;
+        }
+        .alert-item:last-child { margin-bottom: 0; }
+        /* Интенсивность */
+        .badge {
+            display: inline-block;
+            background: #fee2e2;
+            color: #991b1b;
+            border-radius: 2px;
+            padding: 1px 5px;
+            font-size: 8pt;
+            font-weight: 600;
+        }
+        strong { font-weight: 700; }
+        @media print {
+            body { background: white; }
+            .block { page-break-inside: avoid; }
+        }
+"""
+
+# Неизменная часть компактного документа от стилей до блока с данными пациента
+_COMPACT_REPORT_HEAD_END = (
+    "    <style>\n"
+    + _COMPACT_REPORT_CSS
+    + "    </style>\n"
+    "</head>\n"
+    "<body>\n"
+    '<div class="page">\n'
+    '    <div class="report-header">\n'
+    "        <h1>📋 АНКЕТА ПАЦИЕНТА</h1>\n"
+    '        <div class="report-meta">\n'
+)
+_COMPACT_REPORT_CLOSE = "\n</div>\n</body>\n</html>"
 
 
 class ReportGenerator:
@@ -28,35 +382,130 @@ class ReportGenerator:
             config: JSON-конфигурация опросника
         """
         self.config = config
-        self.nodes = {node["id"]: node for node in config.get("nodes", [])}
+        self._nodes_list: List[dict] = config.get("nodes", []) or []
+        self.nodes = {node["id"]: node for node in self._nodes_list}
+        # Метаданные узлов для форматирования ответов считаются один раз:
+        # node_id -> (type, question_text, {option.value: option.text}, additional_fields, max_value)
+        self._node_meta = {
+            node_id: self._build_node_meta(node_id, node) for node_id, node in self.nodes.items()
+        }
+        # Группы и порядок вопросов не зависят от ответов — считаем их один раз
+        self._groups: List[dict] = self.config.get("groups", []) or []
+        self._group_names: Dict[str, str] = {g["id"]: g["name"] for g in self._groups}
+        self._nodes_in_report_order: List[dict] = self._sort_nodes_for_report(self._nodes_list)
+        self._ordered_node_ids: List[str] = [
+            node.get("id", "") for node in self._nodes_in_report_order
+        ]
+        # Узлы, ответы на которые попадают в отчёт (всё, кроме info_screen),
+        # и они же без повторов в порядке отчёта — для блока необработанных ответов
+        self._non_info_node_ids: set[str] = {
+            node_id for node_id, node in self.nodes.items() if node.get("type") != "info_screen"
+        }
+        self._non_info_ordered_ids: List[str] = [
+            node_id
+            for node_id in dict.fromkeys(self._ordered_node_ids)
+            if node_id and node_id in self._non_info_node_ids
+        ]
+        self._node_group_map: Dict[str, str] = {
+            node["id"]: node["group_id"]
+            for node in self._nodes_in_report_order
+            if node.get("group_id")
+        }
+        # Правила системного анализа в готовом к проверке виде
+        self._compiled_rules: List[tuple] = self._compile_analysis_rules(
+            self.config.get("analysis_rules", []) or []
+        )
         # Автоматическое определение версии опросника
         self.survey_version = self._detect_version()
+        # Версия опросника не меняется, поэтому генераторы отчётов выбираются один раз
+        if self.survey_version == 2:
+            self._readable_report_impl = self._generate_readable_html_report_v2
+            self._text_report_impl = self._generate_text_report_v2
+        else:
+            self._readable_report_impl = self._generate_readable_html_report_v1
+            self._text_report_impl = self._generate_text_report_v1
+        # Последняя раскладка ответов по группам: (набор node_id ответов, раскладка)
+        self._partition_cache: Optional[tuple] = None
     
+    @staticmethod
+    def _report_date() -> str:
+        """Текущая дата для шапки отчёта в формате ДД.ММ.ГГГГ ЧЧ:ММ."""
+        now = datetime.now()
+        return f"{now.day:02d}.{now.month:02d}.{now.year} {now.hour:02d}:{now.minute:02d}"
+
     def _detect_version(self) -> int:
         """Определение версии опросника по наличию узлов."""
-        # Узлы, уникальные для v2
-        v2_nodes = {"body_location", "pain_character", "temperature_filter", "resp_filter", "cardio_filter", "gastro_filter"}
-        if v2_nodes & set(self.nodes.keys()):
+        if not self.V2_MARKER_NODE_IDS.isdisjoint(self.nodes):
             return 2
         return 1
 
     # ============================================
-    # Известные (захардкоженные) node_id для v2
+    # Известные (захардкоженные) node_id для v2: узлы, уникальные для v2
+    V2_MARKER_NODE_IDS = frozenset({
+        "body_location", "pain_character", "temperature_filter",
+        "resp_filter", "cardio_filter", "gastro_filter",
+    })
     # Известные (захардкоженные) node_id для v1 (fallback-блок).
-    V1_HANDLED_NODE_IDS = {
+    V1_HANDLED_NODE_IDS = frozenset({
         "welcome", "finish",
         "main_trigger", "pain_details", "systems_screening",
         "respiratory_details", "cardio_details", "gastro_details",
         "risk_factors",
-    }
-    BODY_LOCATION_LABELS = {
+    })
+    # Карты подписей ниже общие для всех экземпляров, поэтому доступны только на чтение.
+    BODY_LOCATION_LABELS: Mapping[str, str] = MappingProxyType({
         "head": "Голова",
         "throat": "Горло",
         "chest": "Грудная клетка",
         "abdomen": "Живот",
         "back": "Поясница",
         "joints": "Суставы/Конечности",
-    }
+    })
+    # Подписи зон карты тела в ответах v2 (здесь суставы — просто «Суставы»)
+    BODY_MAP_ANSWER_LABELS: Mapping[str, str] = MappingProxyType({
+        "head": "Голова", "throat": "Горло",
+        "chest": "Грудная клетка", "abdomen": "Живот",
+        "back": "Поясница", "joints": "Суставы",
+    })
+    # Основная причина обращения (v1)
+    MAIN_COMPLAINT_LABELS: Mapping[str, str] = MappingProxyType({
+        "pain": "Беспокоит боль",
+        "discomfort": "Общее недомогание / Дискомфорт",
+        "checkup": "Плановый осмотр / Справка / Анализы",
+    })
+    # Симптомы дыхательной системы (v1)
+    RESPIRATORY_SYMPTOM_LABELS: Mapping[str, str] = MappingProxyType({
+        "dry_cough": "Кашель сухой",
+        "wet_cough": "Кашель с мокротой",
+        "dyspnea_walking": "Одышка при ходьбе",
+        "asthma_attacks": "Приступы удушья",
+    })
+    # Когда возникают сердечно-сосудистые симптомы (v1)
+    CARDIO_TIMING_LABELS: Mapping[str, str] = MappingProxyType({
+        "exercise": "Симптомы при физической нагрузке",
+        "rest": "Симптомы в покое / Ночью",
+        "constant": "Симптомы постоянно",
+    })
+    # Отёки (v1)
+    EDEMA_LABELS: Mapping[str, str] = MappingProxyType({
+        "legs": "Отёки на ногах",
+        "face": "Отёки на лице",
+    })
+    # Симптомы пищеварительной системы (v1)
+    GASTRO_SYMPTOM_LABELS: Mapping[str, str] = MappingProxyType({
+        "hungry_pain": "Боли 'голодные' или ночные",
+        "after_meal_pain": "Боли после еды",
+        "constipation": "Запоры",
+        "diarrhea": "Диарея",
+        "nausea": "Тошнота/Рвота",
+    })
+    # Факторы риска (v1)
+    RISK_FACTOR_LABELS: Mapping[str, str] = MappingProxyType({
+        "allergy": "⚠️ Аллергия на лекарства или продукты",
+        "diabetes": "Сахарный диабет (личный или семейный анамнез)",
+        "oncology": "🧬 Онкология у кровных родственников",
+        "cardiovascular": "Инфаркты/Инсульты у родителей до 60 лет",
+    })
 
     def _format_body_locations(self, locations: Any) -> Optional[str]:
         if not isinstance(locations, list) or not locations:
@@ -69,21 +518,43 @@ class ReportGenerator:
     # Универсальное форматирование ответа (fallback)
     # ============================================
 
-    def _get_option_text(self, node: dict, value: str) -> str:
+    @staticmethod
+    def _build_node_meta(node_id: str, node: dict) -> tuple:
+        """Метаданные узла, которые нужны при форматировании каждого ответа."""
+        option_texts: Dict[Any, Any] = {}
+        for option in node.get("options") or []:
+            value = option.get("value")
+            # При повторяющихся value побеждает первый вариант, как при линейном поиске
+            if value not in option_texts:
+                option_texts[value] = option["text"] if "text" in option else value
+        return (
+            node.get("type", ""),
+            node.get("question_text", node_id),
+            option_texts,
+            node.get("additional_fields") or [],
+            node.get("max_value"),
+        )
+
+    def _get_option_text(self, node_id: str, value: str) -> str:
         """
         Получение текстового представления варианта ответа по его value.
 
         Args:
-            node: Узел конфигурации
+            node_id: ID узла конфигурации
             value: Значение варианта (option.value)
 
         Returns:
             Текст варианта или исходное значение
         """
-        for option in node.get("options", []):
-            if option.get("value") == value:
-                return option.get("text", value)
-        return value
+        option_texts = self._node_meta[node_id][2]
+        try:
+            return option_texts.get(value, value)
+        except TypeError:
+            # Нехешируемое значение не может совпасть ни с одним option.value
+            return value
+
+    # Поля ответа, из которых собирается текст ответа в отчёте
+    RENDERABLE_ANSWER_KEYS = frozenset({"selected", "value", "text", "locations", "intensity"})
 
     def _format_answer_for_report(
         self, node_id: str, answer: dict, fmt: str = "html"
@@ -99,17 +570,22 @@ class ReportGenerator:
         Returns:
             Отформатированная строка или None
         """
-        node = self.nodes.get(node_id)
-        if not node or not answer:
+        meta = self._node_meta.get(node_id)
+        if not meta or not answer:
             return None
 
-        node_type = node.get("type", "")
-        question = node.get("question_text", node_id)
+        node_type, question, _, additional_fields, max_val = meta
 
         # Пропускаем служебные экраны
         if node_type == "info_screen":
             return None
 
+        # Ответ без отображаемых полей (заглушка) — дальше разбирать нечего
+        if answer.keys().isdisjoint(self.RENDERABLE_ANSWER_KEYS) and not any(
+            field.get("id", "") in answer for field in additional_fields
+        ):
+            return None
+
         # ── Извлечение текстового представления ответа ──
         answer_text = ""
 
@@ -117,17 +593,17 @@ class ReportGenerator:
         if selected is not None:
             if isinstance(selected, list):
                 # multi_choice
-                texts = [self._get_option_text(node, v) for v in selected]
+                option_text = self._get_option_text
+                texts = [option_text(node_id, v) for v in selected]
                 answer_text = ", ".join(texts)
             elif isinstance(selected, bool):
                 answer_text = "Да" if selected else "Нет"
             else:
                 # single_choice
-                answer_text = self._get_option_text(node, str(selected))
+                answer_text = self._get_option_text(node_id, str(selected))
 
         value = answer.get("value")
         if value is not None and not answer_text:
-            max_val = node.get("max_value")
             if max_val is not None:
                 answer_text = f"{value}/{max_val}"
             else:
@@ -139,11 +615,7 @@ class ReportGenerator:
 
         locations = answer.get("locations")
         if isinstance(locations, list) and locations and not answer_text:
-            loc_map = {
-                "head": "Голова", "throat": "Горло",
-                "chest": "Грудная клетка", "abdomen": "Живот",
-                "back": "Поясница", "joints": "Суставы",
-            }
+            loc_map = self.BODY_MAP_ANSWER_LABELS
             answer_text = ", ".join(loc_map.get(l, l) for l in locations)
 
         # Интенсивность (body_map / карта тела)
@@ -157,12 +629,16 @@ class ReportGenerator:
 
         # Дополнительные поля (additional_fields)
         extra_parts: List[str] = []
-        for field in node.get("additional_fields", []):
+        for field in additional_fields:
             fid = field.get("id", "")
             fval = answer.get(fid)
-            if fval is not None and str(fval).strip():
-                flabel = field.get("label", fid)
-                extra_parts.append(f"{flabel}: {fval}")
+            if fval is None:
+                continue
+            # Строку проверяем напрямую, без лишнего str()
+            if not (fval.strip() if isinstance(fval, str) else str(fval).strip()):
+                continue
+            flabel = field.get("label", fid)
+            extra_parts.append(f"{flabel}: {fval}")
 
         if not answer_text and not extra_parts:
             return None
@@ -171,9 +647,16 @@ class ReportGenerator:
         if fmt == "text":
             line = f"• {question}: {answer_text}"
             if extra_parts:
-                line += " (" + "; ".join(extra_parts) + ")"
+                line += f" ({'; '.join(extra_parts)})"
             return line
 
+        # В HTML-форматах текст вопроса, ответа и доп. полей экранируется:
+        # ответы пациента — произвольный текст
+        question = _html_escape(str(question))
+        answer_text = _html_escape(answer_text)
+        if extra_parts:
+            extra_parts = [_html_escape(part) for part in extra_parts]
+
         if fmt == "readable":
             parts = [
                 '<li class="qa-row">'
@@ -191,114 +674,118 @@ class ReportGenerator:
         # html (Битрикс)
         line = f"• <b>{question}:</b> {answer_text}"
         if extra_parts:
-            line += " <i>(" + "; ".join(extra_parts) + ")</i>"
+            line += f" <i>({'; '.join(extra_parts)})</i>"
         return line
 
     def _collect_unhandled_answers(
-        self, answers: Dict[str, Any], handled_ids: set
+        self, answers: Dict[str, Any], handled_ids: AbstractSet[str]
     ) -> List[str]:
         """
         Возвращает список node_id ответов, которые не были обработаны
         специализированными блоками отчёта.
         """
-        unhandled: List[str] = []
-        seen: set[str] = set()
+        candidates = (answers.keys() & self._non_info_node_ids) - handled_ids
+        if not candidates:
+            return []
 
         # Основной порядок берём из конфигурации опроса, чтобы отчёт совпадал
         # с последовательностью вопросов в визуальном редакторе.
-        for node in self._get_nodes_in_report_order():
-            node_id = node.get("id")
-            if not node_id or node_id in seen or node_id not in answers:
-                continue
-            if node_id not in handled_ids:
-                current_node = self.nodes.get(node_id)
-                if current_node and current_node.get("type") != "info_screen":
-                    unhandled.append(node_id)
-                    seen.add(node_id)
-
-        # Сохраняем fallback для ответов, которых уже нет в схеме, но они есть
-        # в старых сохранённых данных сессии.
-        for node_id in answers:
-            if node_id in seen or node_id in handled_ids:
-                continue
-            node = self.nodes.get(node_id)
-            if node and node.get("type") != "info_screen":
-                unhandled.append(node_id)
-                seen.add(node_id)
+        unhandled = [nid for nid in self._non_info_ordered_ids if nid in candidates]
+
+        # Fallback для узлов вне порядка отчёта (например, с пустым id) —
+        # в порядке ответов.
+        if len(unhandled) < len(candidates):
+            emitted = set(unhandled)
+            unhandled.extend(nid for nid in answers if nid in candidates and nid not in emitted)
         return unhandled
 
-    def _generate_unhandled_block_html(
-        self, answers: Dict[str, Any], handled_ids: set
+    # Оформление блока необработанных ответов: (заголовок, префикс строки, разделитель, окончание)
+    UNHANDLED_BLOCK_LAYOUTS = {
+        "html": ("📝 <b>ДОПОЛНИТЕЛЬНЫЕ ВОПРОСЫ:</b><br>", "", "<br>", ""),
+        "readable": ("<ul>", "", "", "</ul>"),
+        "text": ("📝 ДОПОЛНИТЕЛЬНЫЕ ВОПРОСЫ\n", "  ", "\n", ""),
+    }
+
+    def _generate_unhandled_block(
+        self, answers: Dict[str, Any], handled_ids: AbstractSet[str], fmt: str
     ) -> Optional[str]:
         """
-        Генерация HTML-блока (Битрикс) для ответов, не покрытых
-        специализированными блоками.
+        Генерация блока для ответов, не покрытых специализированными блоками.
+
+        Сбор и форматирование общие для всех форматов, различается только
+        оформление (см. UNHANDLED_BLOCK_LAYOUTS).
         """
         unhandled = self._collect_unhandled_answers(answers, handled_ids)
         if not unhandled:
             return None
 
+        header, line_prefix, separator, footer = self.UNHANDLED_BLOCK_LAYOUTS[fmt]
+        format_answer = self._format_answer_for_report
         lines: List[str] = []
         for nid in unhandled:
-            line = self._format_answer_for_report(nid, answers[nid], fmt="html")
+            line = format_answer(nid, answers[nid], fmt=fmt)
             if line:
-                lines.append(line)
+                lines.append(line_prefix + line)
 
         if not lines:
             return None
 
-        items = "<br>".join(lines)
-        return f"📝 <b>ДОПОЛНИТЕЛЬНЫЕ ВОПРОСЫ:</b><br>{items}"
+        return f"{header}{separator.join(lines)}{footer}"
 
-    def _generate_unhandled_block_readable(
-        self, answers: Dict[str, Any], handled_ids: set
+    def _generate_unhandled_block_html(
+        self, answers: Dict[str, Any], handled_ids: AbstractSet[str]
     ) -> Optional[str]:
-        """
-        Генерация readable HTML-блока (PDF) для необработанных ответов.
-        """
-        unhandled = self._collect_unhandled_answers(answers, handled_ids)
-        if not unhandled:
-            return None
-
-        items: List[str] = []
-        for nid in unhandled:
-            line = self._format_answer_for_report(nid, answers[nid], fmt="readable")
-            if line:
-                items.append(line)
+        """HTML-блок (Битрикс) для необработанных ответов."""
+        return self._generate_unhandled_block(answers, handled_ids, "html")
 
-        if not items:
-            return None
-
-        return "<ul>" + "".join(items) + "</ul>"
+    def _generate_unhandled_block_readable(
+        self, answers: Dict[str, Any], handled_ids: AbstractSet[str]
+    ) -> Optional[str]:
+        """Readable HTML-блок (PDF) для необработанных ответов."""
+        return self._generate_unhandled_block(answers, handled_ids, "readable")
 
     def _generate_unhandled_block_text(
-        self, answers: Dict[str, Any], handled_ids: set
+        self, answers: Dict[str, Any], handled_ids: AbstractSet[str]
     ) -> Optional[str]:
+        """Текстовый блок для необработанных ответов."""
+        return self._generate_unhandled_block(answers, handled_ids, "text")
+
+    # ============================================
+    # Системный анализ для врача
+    # ============================================
+
+    @staticmethod
+    def _compile_trigger(trigger: dict) -> tuple:
         """
-        Генерация текстового блока для необработанных ответов.
-        """
-        unhandled = self._collect_unhandled_answers(answers, handled_ids)
-        if not unhandled:
-            return None
+        Подготовка триггера к проверке: (node_id, match_mode, prepared).
 
-        lines: List[str] = ["📝 ДОПОЛНИТЕЛЬНЫЕ ВОПРОСЫ"]
-        for nid in unhandled:
-            line = self._format_answer_for_report(nid, answers[nid], fmt="text")
-            if line:
-                lines.append(f"  {line}")
+        prepared зависит от режима:
+        - contains — искомая подстрока в нижнем регистре без пробелов по краям;
+        - gte — числовой порог (None, если option_value не число);
+        - exact — (option_value, option_value в нижнем регистре, числовой порог или None).
+        """
+        option_value = trigger.get("option_value", "")
+        match_mode = trigger.get("match_mode", "exact")
 
-        if len(lines) <= 1:
-            return None
+        try:
+            threshold: Optional[float] = float(option_value)
+        except (ValueError, TypeError):
+            threshold = None
 
-        return "\n".join(lines)
+        if match_mode == "contains":
+            prepared: Any = str(option_value).lower().strip()
+        elif match_mode == "gte":
+            prepared = threshold
+        else:
+            match_mode = "exact"
+            prepared = (option_value, str(option_value).lower(), threshold)
 
-    # ============================================
-    # Системный анализ для врача
-    # ============================================
+        return trigger.get("node_id", ""), match_mode, prepared
 
-    def _check_trigger(self, trigger: dict, answer: Any) -> bool:
+    @staticmethod
+    def _check_compiled_trigger(match_mode: str, prepared: Any, answer: Any) -> bool:
         """
-        Проверка, сработал ли отдельный триггер для данного ответа.
+        Проверка подготовленного триггера (см. _compile_trigger) для ответа.
 
         Поддерживаемые форматы answer_data:
         - {"selected": "value"}           — single_choice
@@ -311,12 +798,9 @@ class ReportGenerator:
         if not answer or not isinstance(answer, dict):
             return False
 
-        option_value = trigger.get("option_value", "")
-        match_mode = trigger.get("match_mode", "exact")
-
         # ── Режим «contains» — поиск подстроки (регистронезависимо) ──
         if match_mode == "contains":
-            search = option_value.lower().strip()
+            search = prepared
             if not search:
                 return False
             # Проверяем text (text_input)
@@ -338,28 +822,37 @@ class ReportGenerator:
         # ── Режим «gte» — числовое сравнение ≥ порога (слайдер / шкала) ──
         if match_mode == "gte":
             value = answer.get("value")
-            if value is not None:
-                try:
-                    return float(value) >= float(option_value)
-                except (ValueError, TypeError):
-                    return False
-            return False
+            if value is None or prepared is None:
+                return False
+            # Слайдеры и шкалы присылают числа — сравниваем без преобразования
+            if isinstance(value, (int, float)):
+                return value >= prepared
+            try:
+                return float(value) >= prepared
+            except (ValueError, TypeError):
+                return False
 
         # ── Режим «exact» (по умолчанию) ──
+        option_value, option_value_lower, threshold = prepared
+
         # Проверка поля selected (single_choice, multi_choice, consent)
         selected = answer.get("selected")
         if selected is not None:
             if isinstance(selected, list):
                 return option_value in selected
             if isinstance(selected, bool):
-                return str(selected).lower() == option_value.lower()
+                return str(selected).lower() == option_value_lower
             return str(selected) == option_value
 
         # Проверка поля value (slider / scale)
         value = answer.get("value")
         if value is not None:
+            if threshold is None:
+                return str(value) == option_value
+            if isinstance(value, (int, float)):
+                return value >= threshold
             try:
-                return float(value) >= float(option_value)
+                return float(value) >= threshold
             except (ValueError, TypeError):
                 return str(value) == option_value
 
@@ -370,54 +863,80 @@ class ReportGenerator:
 
         return False
 
-    def _evaluate_analysis_rules_with_color(self, answers: Dict[str, Any]) -> List[Dict[str, str]]:
+    def _check_trigger(self, trigger: dict, answer: Any) -> bool:
+        """Проверка, сработал ли отдельный триггер (в исходном виде) для данного ответа."""
+        _, match_mode, prepared = self._compile_trigger(trigger)
+        return self._check_compiled_trigger(match_mode, prepared, answer)
+
+    @classmethod
+    def _compile_analysis_rules(cls, rules: List[dict]) -> List[tuple]:
         """
-        Оценка правил системного анализа по ответам пользователя (с цветом).
+        Подготовка правил системного анализа к многократной проверке.
 
         Returns:
-            Список словарей {'message': str, 'color': str, 'name': str}
-            для сработавших правил.
+            Список (require_all, message, color, name, trigger_groups), где
+            trigger_groups — списки подготовленных триггеров. Для режима «all»
+            триггеры сгруппированы по node_id (в каждой группе должен сработать
+            хотя бы один), для «any» — одна общая группа.
+            Правила без триггеров или без сообщения отбрасываются.
         """
-        rules = self.config.get("analysis_rules", [])
-        if not rules:
-            return []
-
-        triggered: List[Dict[str, str]] = []
-
+        compiled: List[tuple] = []
         for rule in rules:
             triggers = rule.get("triggers", [])
             if not triggers:
                 continue
 
-            mode = rule.get("trigger_mode", "any")
             message = rule.get("message", "").strip()
             if not message:
                 continue
 
-            if mode == "all":
-                groups: Dict[str, List] = {}
-                for t in triggers:
-                    nid = t.get("node_id", "")
-                    groups.setdefault(nid, []).append(t)
-
-                fired = all(
-                    any(
-                        self._check_trigger(t, answers.get(t.get("node_id", "")))
-                        for t in grp
-                    )
-                    for grp in groups.values()
-                )
+            prepared = [cls._compile_trigger(t) for t in triggers]
+            require_all = rule.get("trigger_mode", "any") == "all"
+            if require_all:
+                groups: Dict[str, List[tuple]] = {}
+                for trigger in prepared:
+                    groups.setdefault(trigger[0], []).append(trigger)
+                trigger_groups = list(groups.values())
             else:
-                fired = any(
-                    self._check_trigger(t, answers.get(t.get("node_id", "")))
-                    for t in triggers
+                trigger_groups = [prepared]
+
+            compiled.append((
+                require_all,
+                message,
+                rule.get("color", "red"),
+                rule.get("name", ""),
+                trigger_groups,
+            ))
+        return compiled
+
+    def _evaluate_analysis_rules_with_color(self, answers: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Оценка правил системного анализа по ответам пользователя (с цветом).
+
+        Returns:
+            Список словарей {'message': str, 'color': str, 'name': str}
+            для сработавших правил.
+        """
+        triggered: List[Dict[str, str]] = []
+        # Локальные ссылки вместо поиска атрибутов на каждом триггере
+        check = self._check_compiled_trigger
+        get_answer = answers.get
+
+        for require_all, message, color, name, trigger_groups in self._compiled_rules:
+            group_results = (
+                any(
+                    check(match_mode, prepared, get_answer(node_id))
+                    for node_id, match_mode, prepared in group
                 )
+                for group in trigger_groups
+            )
+            fired = all(group_results) if require_all else any(group_results)
 
             if fired:
                 triggered.append({
                     "message": message,
-                    "color": rule.get("color", "red"),
-                    "name": rule.get("name", ""),
+                    "color": color,
+                    "name": name,
                 })
 
         return triggered
@@ -430,27 +949,59 @@ class ReportGenerator:
         "green":  {"bg": "#f0fdf4", "border": "#86efac", "text": "#166534", "emoji": "🟢"},
     }
 
+    # Начало карточки сработавшего правила для каждого цвета (до подписи правила):
+    # стили и эмодзи не зависят от ответов, поэтому собираются один раз
+    ANALYSIS_CARD_PREFIXES_HTML = {
+        color: (
+            f'<div style="background:{palette["bg"]};border-left:4px solid {palette["border"]};'
+            f'padding:8px 12px;margin-bottom:8px;border-radius:4px;color:{palette["text"]}">'
+            f'{palette["emoji"]} '
+        )
+        for color, palette in TRIGGER_COLOR_MAP.items()
+    }
+    ANALYSIS_CARD_PREFIXES_READABLE = {
+        color: (
+            f'<div class="analysis-trigger-card" style="background:{palette["bg"]};'
+            f'border-left:4px solid {palette["border"]};padding:10px 14px;'
+            f'margin-bottom:10px;border-radius:6px;color:{palette["text"]};'
+            f'font-size:8.5pt;line-height:1.55">'
+            f'{palette["emoji"]} '
+        )
+        for color, palette in TRIGGER_COLOR_MAP.items()
+    }
+
+    def _get_analysis_cards(self, answers: Dict[str, Any]) -> List[tuple]:
+        """
+        Сработавшие правила анализа в виде (color, name, message).
+
+        Общая часть HTML- и readable-блоков анализа: они отличаются
+        только разметкой карточки. Неизвестный цвет заменяется красным.
+        """
+        palettes = self.TRIGGER_COLOR_MAP
+        cards = []
+        for item in self._evaluate_analysis_rules_with_color(answers):
+            color = item.get("color", "red")
+            cards.append((
+                color if color in palettes else "red",
+                item.get("name", ""),
+                item.get("message", ""),
+            ))
+        return cards
+
     def _generate_analysis_block_html(self, answers: Dict[str, Any]) -> Optional[str]:
         """
         Генерация HTML-блока «Системный анализ для врача» (формат Битрикс24).
         Каждый триггер — отдельный абзац с цветовым фоном.
         """
-        triggered = self._evaluate_analysis_rules_with_color(answers)
-        if not triggered:
+        cards = self._get_analysis_cards(answers)
+        if not cards:
             return None
 
+        prefixes = self.ANALYSIS_CARD_PREFIXES_HTML
         parts = ["⚠️ <b>СИСТЕМНЫЙ АНАЛИЗ ДЛЯ ВРАЧА:</b><br>"]
-        for item in triggered:
-            color = item.get("color", "red")
-            palette = self.TRIGGER_COLOR_MAP.get(color, self.TRIGGER_COLOR_MAP["red"])
-            name = item.get("name", "")
-            message = item.get("message", "")
+        for color, name, message in cards:
             label = f"<b>{name}</b>: " if name else ""
-            parts.append(
-                f'<div style="background:{palette["bg"]};border-left:4px solid {palette["border"]};'
-                f'padding:8px 12px;margin-bottom:8px;border-radius:4px;color:{palette["text"]}">'
-                f'{palette["emoji"]} {label}{message}</div>'
-            )
+            parts.append(f"{prefixes[color]}{label}{message}</div>")
         return "".join(parts)
 
     def _generate_analysis_block_readable(self, answers: Dict[str, Any]) -> Optional[str]:
@@ -458,24 +1009,16 @@ class ReportGenerator:
         Генерация читаемого HTML-блока анализа для предпросмотра / PDF.
         Каждый триггер — отдельная карточка с цветовым фоном.
         """
-        triggered = self._evaluate_analysis_rules_with_color(answers)
-        if not triggered:
+        cards = self._get_analysis_cards(answers)
+        if not cards:
             return None
 
-        items_html = ""
-        for item in triggered:
-            color = item.get("color", "red")
-            palette = self.TRIGGER_COLOR_MAP.get(color, self.TRIGGER_COLOR_MAP["red"])
-            name = item.get("name", "")
-            message = item.get("message", "")
+        prefixes = self.ANALYSIS_CARD_PREFIXES_READABLE
+        items_html_parts: List[str] = []
+        for color, name, message in cards:
             label = f"<strong>{name}:</strong> " if name else ""
-            items_html += (
-                f'<div class="analysis-trigger-card" style="background:{palette["bg"]};'
-                f'border-left:4px solid {palette["border"]};padding:10px 14px;'
-                f'margin-bottom:10px;border-radius:6px;color:{palette["text"]};'
-                f'font-size:8.5pt;line-height:1.55">'
-                f'{palette["emoji"]} {label}{message}</div>'
-            )
+            items_html_parts.append(f"{prefixes[color]}{label}{message}</div>")
+        items_html = "".join(items_html_parts)
         return (
             '<div class="block analysis-block">'
             '<div class="block-title">⚠️ СИСТЕМНЫЙ АНАЛИЗ ДЛЯ ВРАЧА</div>'
@@ -489,580 +1032,285 @@ class ReportGenerator:
 
     def _get_groups(self) -> List[dict]:
         """Получение списка групп из конфигурации опросника."""
-        return self.config.get("groups", []) or []
+        return self._groups
 
     def _get_nodes_in_report_order(self) -> List[dict]:
-        """
-        Возвращает узлы в порядке визуального редактора.
-
-        Если у узла есть координаты на canvas, используем их и сортируем сверху
-        вниз, а при равной высоте слева направо. Если координат нет, сохраняем
-        исходный порядок узлов в конфигурации.
-        """
-        indexed_nodes = list(enumerate(self.config.get("nodes", []) or []))
-
-        def sort_key(item: tuple[int, dict]) -> tuple[float, float, int]:
-            index, node = item
-            position = node.get("position") or {}
-            x = position.get("x")
-            y = position.get("y")
-
-            if isinstance(x, (int, float)) and isinstance(y, (int, float)):
-                return (float(y), float(x), index)
-
-            return (float(index), 0.0, index)
-
-        return [node for _, node in sorted(indexed_nodes, key=sort_key)]
-
-    def _group_node_ids(self) -> Dict[str, str]:
-        """
-        Построение маппинга node_id -> group_id из конфигурации.
-
-        Returns:
-            Словарь {node_id: group_id}
-        """
-        mapping: Dict[str, str] = {}
-        for node in self._get_nodes_in_report_order():
-            gid = node.get("group_id")
-            if gid:
-                mapping[node["id"]] = gid
-        return mapping
-
-    def _generate_grouped_answers(
-        self, answers: Dict[str, Any], fmt: str = "html"
-    ) -> tuple:
-        """
-        Генерация ответов, разделённых на группированные и негруппированные.
-
-        Args:
-            answers: Словарь ответов {node_id: answer_data}
-            fmt: Формат вывода — "html", "readable", "text"
+        """Возвращает узлы в порядке визуального редактора (рассчитан в __init__)."""
+        return self._nodes_in_report_order
 
-        Returns:
-            (группированные_блоки, негруппированные_ответы)
-            – grouped: список туплов (group_name, items)
-            – ungrouped: список форматированных строк
+    @staticmethod
+    def _sort_nodes_for_report(nodes: List[dict]) -> List[dict]:
         """
-        groups = self._get_groups()
-        node_group_map = self._group_node_ids()
-        group_map = {g["id"]: g["name"] for g in groups}
-
-        # Собираем ответы по группам в порядке конфигурации
-        grouped: Dict[str, List[str]] = {g["id"]: [] for g in groups}
-        ungrouped: List[str] = []
-
-        for node in self._get_nodes_in_report_order():
-            node_id = node.get("id", "")
-            if node_id not in answers:
-                continue
-            line = self._format_answer_for_report(node_id, answers[node_id], fmt=fmt)
-            if not line:
-                continue
-
-            gid = node_group_map.get(node_id)
-            if gid and gid in grouped:
-                grouped[gid].append(line)
-            else:
-                ungrouped.append(line)
+        Сортирует узлы в порядке визуального редактора.
 
-        # Собираем непустые группы с сохранением порядка
-        result_groups = []
-        for g in groups:
-            items = grouped.get(g["id"], [])
-            if items:
-                result_groups.append((group_map[g["id"]], items))
-
-        return result_groups, ungrouped
-
-    def generate_readable_html_report(
-        self,
-        patient_name: Optional[str],
-        answers: Dict[str, Any],
-    ) -> str:
-        """
-        Генерация читаемого HTML-отчёта для просмотра и экспорта.
-        Отформатирован с CSS стилями для удобного чтения.
-        
-        Args:
-            patient_name: Имя пациента
-            answers: Словарь ответов {node_id: answer_data}
-            
-        Returns:
-            Полный HTML-документ с встроенными стилями
-        """
-        if self.survey_version == 2:
-            return self._generate_readable_html_report_v2(patient_name, answers)
-        return self._generate_readable_html_report_v1(patient_name, answers)
-    
-    def _generate_readable_html_report_v1(
-        self,
-        patient_name: Optional[str],
-        answers: Dict[str, Any],
-    ) -> str:
-        """Генерация читаемого HTML-отчёта для v1 опросника."""
-        # Генерируем содержимое
-        content_parts = []
-        
-        # Заголовок
-        name = patient_name or "Не указано"
-        date = datetime.now().strftime("%d.%m.%Y %H:%M")
-        
-        content_parts.append(f"""
-        <div class="header">
-            <h1>📋 АНКЕТА ПАЦИЕНТА</h1>
-            <p class="subtitle">Предварительный опрос</p>
-            <div class="patient-info">
-                <div><strong>Пациент:</strong> {name}</div>
-                <div><strong>Дата:</strong> {date}</div>
-            </div>
-        </div>
-        """)
-        
-        # Системный анализ для врача (в самый верх, перед остальными результатами)
-        analysis_html = self._generate_analysis_block_readable(answers)
-        if analysis_html:
-            content_parts.append(analysis_html)
-        
-        # Основная жалоба
-        main_complaint = self._generate_readable_main_complaint(answers)
-        if main_complaint:
-            content_parts.append(f'<div class="section">{main_complaint}</div>')
-        
-        # Детализация боли
-        pain_details = self._generate_readable_pain_details(answers)
-        if pain_details:
-            content_parts.append(f'<div class="section">{pain_details}</div>')
-        
-        # Скрининг систем
-        systems_screening = self._generate_readable_systems_screening(answers)
-        if systems_screening:
-            content_parts.append(f'<div class="section">{systems_screening}</div>')
-        
-        # Факторы риска
-        risk_factors = self._generate_readable_risk_factors(answers)
-        if risk_factors:
-            content_parts.append(f'<div class="section">{risk_factors}</div>')
-        
-        # Fallback: необработанные ответы (v1)
-        unhandled_readable = self._generate_unhandled_block_readable(
-            answers, self.V1_HANDLED_NODE_IDS
-        )
-        if unhandled_readable:
-            content_parts.append(
-                f'<div class="section"><h2>📝 Дополнительные вопросы</h2>{unhandled_readable}</div>'
-            )
-        
-        # Собираем полный HTML документ
-        html = f"""
-<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Анкета пациента - {name}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background: #f5f5f5;
-            padding: 20px;
-        }}
-        
-        .container {{
-            max-width: 900px;
-            margin: 0 auto;
-            background: white;
-            padding: 40px;
-            border-radius: 12px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }}
-        
-        .header {{
-            border-bottom: 3px solid #2563eb;
-            padding-bottom: 20px;
-            margin-bottom: 30px;
-        }}
-        
-        .header h1 {{
-            font-size: 28px;
-            color: #1e293b;
-            margin-bottom: 8px;
-        }}
-        
-        .subtitle {{
-            font-size: 16px;
-            color: #64748b;
-            margin-bottom: 15px;
-        }}
-        
-        .patient-info {{
-            display: flex;
-            gap: 30px;
-            font-size: 15px;
-            color: #334155;
-        }}
-        
-        .section {{
-            margin-bottom: 30px;
-            padding: 20px;
-            background: #f8fafc;
-            border-radius: 8px;
-            border-left: 4px solid #3b82f6;
-        }}
-        
-        .section h2 {{
-            font-size: 20px;
-            color: #1e293b;
-            margin-bottom: 15px;
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }}
-        
-        .section h3 {{
-            font-size: 17px;
-            color: #334155;
-            margin-top: 15px;
-            margin-bottom: 10px;
-        }}
-        
-        .section p {{
-            margin-bottom: 8px;
-            color: #475569;
-        }}
-        
-        .section ul {{
-            margin-left: 20px;
-            margin-top: 10px;
-        }}
-        
-        .section li {{
-            margin-bottom: 6px;
-            color: #475569;
-        }}
-        
-        .alert-item {{
-            background: white;
-            padding: 12px;
-            margin-bottom: 10px;
-            border-radius: 6px;
-            border-left: 3px solid #f59e0b;
-        }}
-        
-        .intensity-badge {{
-            display: inline-block;
-            padding: 4px 12px;
-            background: #fee2e2;
-            color: #991b1b;
-            border-radius: 4px;
-            font-weight: 600;
-            font-size: 14px;
-        }}
-        
-        .risk-badge {{
-            display: inline-block;
-            padding: 4px 12px;
-            background: #fef3c7;
-            color: #92400e;
-            border-radius: 4px;
-            font-weight: 600;
-            font-size: 14px;
-            margin-left: 8px;
-        }}
-        
-        @media print {{
-            body {{
-                background: white;
-                padding: 0;
-            }}
-            .container {{
-                box-shadow: none;
-                padding: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        {"".join(content_parts)}
-    </div>
-</body>
-</html>
+        Если у узла есть координаты на canvas, используем их и сортируем сверху
+        вниз, а при равной высоте слева направо. Если координат нет, сохраняем
+        исходный порядок узлов в конфигурации.
         """
-        
-        return html
-    
-    def _generate_readable_html_report_v2(
-        self,
-        patient_name: Optional[str],
-        answers: Dict[str, Any],
-    ) -> str:
-        """Генерация читаемого HTML-отчёта для v2 опросника — один лист А4.
+        indexed_nodes = list(enumerate(nodes))
 
-        Ответы группируются по настроенным группам, остаток в «Результаты опроса».
+        def sort_key(item: tuple[int, dict]) -> tuple[float, float, int]:
+            index, node = item
+            position = node.get("position") or {}
+            x = position.get("x")
+            y = position.get("y")
+
+            if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+                return (float(y), float(x), index)
+
+            return (float(index), 0.0, index)
+
+        return [node for _, node in sorted(indexed_nodes, key=sort_key)]
+
+    def _group_node_ids(self) -> Dict[str, str]:
         """
-        name = patient_name or "Не указано"
-        date = datetime.now().strftime("%d.%m.%Y %H:%M")
+        Построение маппинга node_id -> group_id из конфигурации.
 
-        # Системный анализ для врача
-        analysis_html = self._generate_analysis_block_readable(answers) or ""
+        Returns:
+            Словарь {node_id: group_id}
+        """
+        return self._node_group_map
 
-        # Группировка ответов
-        grouped, ungrouped = self._generate_grouped_answers(answers, fmt="readable")
+    def _partition_answers_by_group(self, answers: Dict[str, Any]) -> tuple:
+        """
+        Раскладка отвеченных узлов по группам, не зависящая от формата.
 
-        # Блоки групп (строго над «Результаты опроса»)
-        groups_html = ""
-        for group_name, items in grouped:
-            groups_html += (
-                '<div class="block">'
-                f'<div class="block-title">📁 {group_name}</div>'
-                '<div class="block-body"><ul>'
-                + "".join(items)
-                + '</ul></div>'
-                '</div>'
-            )
+        Returns:
+            ({group_id: [node_id, ...]}, [node_id без группы, ...]) в порядке отчёта.
+            Раскладка зависит только от набора ключей answers, поэтому последняя
+            запоминается: HTML и TXT одного отчёта используют её повторно.
+        """
+        key = frozenset(answers)
+        cached = self._partition_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
 
-        # Блок «Результаты опроса» (скрывается если пустой)
-        answers_html = ""
-        if ungrouped:
-            answers_html = (
-                '<div class="block">'
-                '<div class="block-title">📋 Результаты опроса</div>'
-                '<div class="block-body"><ul>'
-                + "".join(ungrouped)
-                + '</ul></div>'
-                '</div>'
-            )
+        grouped: Dict[str, List[str]] = {g["id"]: [] for g in self._groups}
+        ungrouped: List[str] = []
+        group_of = self._node_group_map.get
 
-        section_html = analysis_html + groups_html + answers_html
-        html = self._wrap_in_html_document_compact(name, date, section_html)
-        return html
+        for node_id in self._ordered_node_ids:
+            if node_id not in answers:
+                continue
+            gid = group_of(node_id)
+            if gid and gid in grouped:
+                grouped[gid].append(node_id)
+            else:
+                ungrouped.append(node_id)
+
+        partition = (grouped, ungrouped)
+        self._partition_cache = (key, partition)
+        return partition
+
+    def _generate_grouped_answers(
+        self, answers: Dict[str, Any], fmt: str = "html"
+    ) -> tuple:
+        """
+        Генерация ответов, разделённых на группированные и негруппированные.
+
+        Args:
+            answers: Словарь ответов {node_id: answer_data}
+            fmt: Формат вывода — "html", "readable", "text"
+
+        Returns:
+            (группированные_блоки, негруппированные_ответы)
+            – grouped: список туплов (group_name, items)
+            – ungrouped: список форматированных строк
+        """
+        grouped_ids, ungrouped_ids = self._partition_answers_by_group(answers)
+        group_map = self._group_names
+        format_answer = self._format_answer_for_report
+
+        def format_items(node_ids: List[str]) -> List[str]:
+            lines: List[str] = []
+            for node_id in node_ids:
+                line = format_answer(node_id, answers[node_id], fmt=fmt)
+                if line:
+                    lines.append(line)
+            return lines
+
+        # Собираем непустые группы с сохранением порядка
+        result_groups = []
+        for g in self._groups:
+            items = format_items(grouped_ids.get(g["id"], []))
+            if items:
+                result_groups.append((group_map[g["id"]], items))
+
+        ungrouped = format_items(ungrouped_ids)
+        return result_groups, ungrouped
+
+    def generate_readable_html_report(
+        self,
+        patient_name: Optional[str],
+        answers: Dict[str, Any],
+    ) -> str:
+        """
+        Генерация читаемого HTML-отчёта для просмотра и экспорта.
+        Отформатирован с CSS стилями для удобного чтения.
+        
+        Args:
+            patient_name: Имя пациента
+            answers: Словарь ответов {node_id: answer_data}
+            
+        Returns:
+            Полный HTML-документ с встроенными стилями
+        """
+        return self._readable_report_impl(patient_name, answers, self._report_date())
     
-    def _wrap_in_html_document_compact(self, patient_name: str, date: str, sections_html: str) -> str:
-        """Компактный HTML-документ для вывода на одном листе А4."""
-        return f"""<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="UTF-8">
-    <title>Анкета — {patient_name}</title>
-    <style>
-        @page {{ size: A4; margin: 8mm 10mm; }}
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: Arial, sans-serif;
-            font-size: 9pt;
-            line-height: 1.6;
-            color: #1a1a1a;
-            background: #fff;
-        }}
-        .page {{
-            width: 190mm;
-            margin: 0 auto;
-        }}
-        /* ── Шапка ── */
-        .report-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            border-bottom: 1.5pt solid #1d4ed8;
-            padding-bottom: 5px;
-            margin-bottom: 8px;
-        }}
-        .report-header h1 {{
-            font-size: 11pt;
-            font-weight: 700;
-            color: #1d4ed8;
-            letter-spacing: 0.3px;
-        }}
-        .report-meta {{
-            font-size: 8pt;
-            color: #555;
-            text-align: right;
-            line-height: 1.7;
-        }}
-        /* ── Блоки ── */
-        .block {{
-            border: 0.75pt solid #cbd5e1;
-            border-radius: 4px;
-            margin-bottom: 7px;
-            page-break-inside: avoid;
-        }}
-        .block-title {{
-            background: #eff6ff;
-            border-bottom: 0.75pt solid #bfdbfe;
-            padding: 4px 8px;
-            font-size: 9pt;
-            font-weight: 700;
-            color: #1e40af;
-            letter-spacing: 0.2px;
-        }}
-        .block-body {{
-            padding: 5px 8px 6px;
-        }}
-        /* ── Подблоки внутри (h2) ── */
-        .block-body h2 {{
-            font-size: 8.5pt;
-            font-weight: 700;
-            color: #374151;
-            margin-top: 7px;
-            margin-bottom: 2px;
-            border-bottom: 0.5pt solid #e5e7eb;
-            padding-bottom: 2px;
-        }}
-        .block-body h2:first-child {{ margin-top: 0; }}
-        .block-body p {{
-            font-size: 8.5pt;
-            margin-bottom: 3px;
-            color: #1a1a1a;
-            line-height: 1.55;
-        }}
-        .block-body ul {{
-            margin: 2px 0 4px 14px;
-            padding: 0;
-        }}
-        .block-body li {{
-            font-size: 8.5pt;
-            margin-bottom: 2px;
-            color: #1a1a1a;
-            line-height: 1.55;
-            list-style: disc;
-        }}
-        .block-body li.qa-row {{
-            list-style: none;
-            display: block;
-            margin-left: -14px;
-            margin-bottom: 5px;
-            padding: 5px 6px 6px;
-            border: 0.75pt solid #e2e8f0;
-            border-radius: 7px;
-            background: linear-gradient(180deg, #ffffff 0%, #f8fbff 100%);
-            box-shadow: 0 1px 0 rgba(148, 163, 184, 0.08);
-            page-break-inside: avoid;
-        }}
-        .block-body .qa-kicker {{
-            display: inline-block;
-            margin-bottom: 2px;
-            padding: 1px 6px;
-            font-size: 6.7pt;
-            font-weight: 700;
-            letter-spacing: 0.2px;
-            text-transform: uppercase;
-            color: #0f766e;
-            background: #ecfeff;
-            border-radius: 999px;
-        }}
-        .block-body .qa-question {{
-            display: block;
-            font-size: 8.9pt;
-            font-weight: 400;
-            line-height: 1.42;
-            margin-bottom: 3px;
-            color: #334155;
-            word-break: break-word;
-        }}
-        .block-body .qa-answer-kicker {{
-            color: #1d4ed8;
-            background: #eff6ff;
-            margin-bottom: 2px;
-        }}
-        .block-body .qa-answer {{
-            display: block;
-            font-size: 9.8pt;
-            font-weight: 700;
-            line-height: 1.4;
-            text-align: left;
-            padding: 4px 6px;
-            border-radius: 6px;
-            background: #f8fafc;
-            border: 0.75pt solid #dbeafe;
-            color: #0f172a;
-            word-break: break-word;
-        }}
-        .block-body .qa-extra {{
-            display: block;
-            font-size: 7.8pt;
-            line-height: 1.45;
-            margin-top: 3px;
-            color: #64748b;
-        }}
-        /* ── Системный анализ для врача ── */
-        .analysis-block {{
-            border: 1.5pt solid #f59e0b;
-            background: #fffbeb;
-            margin-bottom: 8px;
-        }}
-        .analysis-block .block-title {{
-            background: #fef3c7;
-            border-bottom: 1pt solid #fcd34d;
-            color: #92400e;
-            font-size: 9.5pt;
-        }}
-        .analysis-block .block-body ul {{
-            margin: 3px 0 3px 16px;
-        }}
-        .analysis-block .block-body li {{
-            color: #78350f;
-            font-weight: 500;
-            font-size: 8.5pt;
-            margin-bottom: 3px;
-        }}
-        /* ── Алерты ── */
-        .alert-block {{
-            background: #fff7ed;
-            border: 0.75pt solid #fed7aa;
-        }}
-        .alert-block .block-title {{
-            background: #fff7ed;
-            border-bottom-color: #fed7aa;
-            color: #9a3412;
-        }}
-        .alert-item {{
-            background: #fff;
-            border-left: 2pt solid #f59e0b;
-            padding: 4px 7px;
-            margin-bottom: 4px;
-            font-size: 8pt;
-            line-height: 1.5;
-            border-radius: 0 2px 2px 0;
-        }}
-        .alert-item:last-child {{ margin-bottom: 0; }}
-        /* Интенсивность */
-        .badge {{
-            display: inline-block;
-            background: #fee2e2;
-            color: #991b1b;
-            border-radius: 2px;
-            padding: 1px 5px;
-            font-size: 8pt;
-            font-weight: 600;
-        }}
-        strong {{ font-weight: 700; }}
-        @media print {{
-            body {{ background: white; }}
-            .block {{ page-break-inside: avoid; }}
-        }}
-    </style>
+    def _generate_readable_html_report_v1(
+        self,
+        patient_name: Optional[str],
+        answers: Dict[str, Any],
+        date: str,
+    ) -> str:
+        """Генерация читаемого HTML-отчёта для v1 опросника."""
+        # Генерируем содержимое
+        content_parts = []
+        
+        # Заголовок (имя экранируется один раз: оно попадает и в <title>, и в шапку)
+        name = _html_escape(patient_name or "Не указано")
+        
+        content_parts.append(f"""
+        <div class="header">
+            <h1>📋 АНКЕТА ПАЦИЕНТА</h1>
+            <p class="subtitle">Предварительный опрос</p>
+            <div class="patient-info">
+                <div><strong>Пациент:</strong> {name}</div>
+                <div><strong>Дата:</strong> {date}</div>
+            </div>
+        </div>
+        """)
+        
+        # Системный анализ для врача (в самый верх, перед остальными результатами)
+        analysis_html = self._generate_analysis_block_readable(answers)
+        if analysis_html:
+            content_parts.append(analysis_html)
+        
+        # Основная жалоба
+        main_complaint = self._generate_readable_main_complaint(answers)
+        if main_complaint:
+            content_parts.append(f'<div class="section">{main_complaint}</div>')
+        
+        # Детализация боли
+        pain_details = self._generate_readable_pain_details(answers)
+        if pain_details:
+            content_parts.append(f'<div class="section">{pain_details}</div>')
+        
+        # Скрининг систем
+        systems_screening = self._generate_readable_systems_screening(answers)
+        if systems_screening:
+            content_parts.append(f'<div class="section">{systems_screening}</div>')
+        
+        # Факторы риска
+        risk_factors = self._generate_readable_risk_factors(answers)
+        if risk_factors:
+            content_parts.append(f'<div class="section">{risk_factors}</div>')
+        
+        # Fallback: необработанные ответы (v1)
+        unhandled_readable = self._generate_unhandled_block_readable(
+            answers, self.V1_HANDLED_NODE_IDS
+        )
+        if unhandled_readable:
+            content_parts.append(
+                f'<div class="section"><h2>📝 Дополнительные вопросы</h2>{unhandled_readable}</div>'
+            )
+        
+        # Собираем полный HTML документ одним join — без промежуточной
+        # строки содержимого и её повторного копирования в f-строку
+        document_head = f"""
+<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Анкета пациента - {name}</title>
+    <style>
+"""
+        document_body_open = """    </style>
 </head>
 <body>
-<div class="page">
-    <div class="report-header">
-        <h1>📋 АНКЕТА ПАЦИЕНТА</h1>
-        <div class="report-meta">
-            <div><strong>Пациент:</strong> {patient_name}</div>
-            <div><strong>Дата:</strong> {date}</div>
-        </div>
+    <div class="container">
+        """
+        document_tail = """
     </div>
-    {sections_html}
-</div>
 </body>
-</html>"""
+</html>
+        """
+        return "".join((
+            document_head,
+            _REPORT_CSS,
+            document_body_open,
+            *content_parts,
+            document_tail,
+        ))
+    
+    def _generate_readable_html_report_v2(
+        self,
+        patient_name: Optional[str],
+        answers: Dict[str, Any],
+        date: str,
+    ) -> str:
+        """Генерация читаемого HTML-отчёта для v2 опросника — один лист А4.
+
+        Ответы группируются по настроенным группам, остаток в «Результаты опроса».
+        """
+        # Имя экранируется один раз: оно попадает и в <title>, и в шапку
+        name = _html_escape(patient_name or "Не указано")
+
+        # Прерванная сессия без ответов: ни анализ, ни группы ничего не дадут
+        if not answers:
+            return self._wrap_in_html_document_compact(name, date, "")
+
+        # Системный анализ для врача
+        analysis_html = self._generate_analysis_block_readable(answers) or ""
+
+        # Группировка ответов
+        grouped, ungrouped = self._generate_grouped_answers(answers, fmt="readable")
+
+        # Блоки групп (строго над «Результаты опроса»)
+        groups_html_parts: List[str] = []
+        for group_name, items in grouped:
+            groups_html_parts.append(
+                '<div class="block">'
+                f'<div class="block-title">📁 {group_name}</div>'
+                '<div class="block-body"><ul>'
+            )
+            groups_html_parts.extend(items)
+            groups_html_parts.append('</ul></div></div>')
+        groups_html = "".join(groups_html_parts)
+
+        # Блок «Результаты опроса» (скрывается если пустой)
+        answers_html = ""
+        if ungrouped:
+            answers_html = (
+                '<div class="block">'
+                '<div class="block-title">📋 Результаты опроса</div>'
+                f'<div class="block-body"><ul>{"".join(ungrouped)}</ul></div>'
+                '</div>'
+            )
+
+        section_html = f"{analysis_html}{groups_html}{answers_html}"
+        html = self._wrap_in_html_document_compact(name, date, section_html)
+        return html
+    
+    def _wrap_in_html_document_compact(self, patient_name: str, date: str, sections_html: str) -> str:
+        """Компактный HTML-документ для вывода на одном листе А4."""
+        # Форматируются только короткие куски с именем и датой, остальное — константы
+        return "".join((
+            '<!DOCTYPE html>\n'
+            '<html lang="ru">\n'
+            '<head>\n'
+            '    <meta charset="UTF-8">\n'
+            f'    <title>Анкета — {patient_name}</title>\n',
+            _COMPACT_REPORT_HEAD_END,
+            f'            <div><strong>Пациент:</strong> {patient_name}</div>\n'
+            f'            <div><strong>Дата:</strong> {date}</div>\n'
+            '        </div>\n'
+            '    </div>\n'
+            '    ',
+            sections_html,
+            _COMPACT_REPORT_CLOSE,
+        ))
 
     def generate_text_report(
         self,
@@ -1079,21 +1327,19 @@ class ReportGenerator:
         Returns:
             Текстовая строка отчёта
         """
-        if self.survey_version == 2:
-            return self._generate_text_report_v2(patient_name, answers)
-        return self._generate_text_report_v1(patient_name, answers)
+        return self._text_report_impl(patient_name, answers, self._report_date())
     
     def _generate_text_report_v1(
         self,
         patient_name: Optional[str],
         answers: Dict[str, Any],
+        date: str,
     ) -> str:
         """Генерация текстового отчёта для v1 опросника."""
         lines = []
         
         # Заголовок
         name = patient_name or "Не указано"
-        date = datetime.now().strftime("%d.%m.%Y %H:%M")
         
         lines.append("=" * 70)
         lines.append("📋 АНКЕТА ПАЦИЕНТА (Предварительный опрос)")
@@ -1103,37 +1349,19 @@ class ReportGenerator:
         lines.append("=" * 70)
         lines.append("")
         
-        # Основная жалоба
-        main_complaint = self._generate_text_main_complaint(answers)
-        if main_complaint:
-            lines.append(main_complaint)
-            lines.append("")
-        
-        # Детализация боли
-        pain_details = self._generate_text_pain_details(answers)
-        if pain_details:
-            lines.append(pain_details)
-            lines.append("")
-        
-        # Скрининг систем
-        systems_screening = self._generate_text_systems_screening(answers)
-        if systems_screening:
-            lines.append(systems_screening)
-            lines.append("")
-        
-        # Факторы риска
-        risk_factors = self._generate_text_risk_factors(answers)
-        if risk_factors:
-            lines.append(risk_factors)
-            lines.append("")
-        
-        # Fallback: необработанные ответы (v1)
-        unhandled_text = self._generate_unhandled_block_text(
-            answers, self.V1_HANDLED_NODE_IDS
+        # Основная жалоба, боль, скрининг систем, факторы риска и fallback
+        # для необработанных ответов (v1); каждый блок отделяется пустой строкой
+        blocks = (
+            self._generate_text_main_complaint(answers),
+            self._generate_text_pain_details(answers),
+            self._generate_text_systems_screening(answers),
+            self._generate_text_risk_factors(answers),
+            self._generate_unhandled_block_text(answers, self.V1_HANDLED_NODE_IDS),
         )
-        if unhandled_text:
-            lines.append(unhandled_text)
-            lines.append("")
+        for block in blocks:
+            if block:
+                lines.append(block)
+                lines.append("")
         
         lines.append("=" * 70)
         lines.append("Конец отчёта")
@@ -1145,6 +1373,7 @@ class ReportGenerator:
         self,
         patient_name: Optional[str],
         answers: Dict[str, Any],
+        date: str,
     ) -> str:
         """Генерация текстового отчёта для v2 опросника.
 
@@ -1152,7 +1381,6 @@ class ReportGenerator:
         """
         lines = []
         name = patient_name or "Не указано"
-        date = datetime.now().strftime("%d.%m.%Y %H:%M")
         
         lines.append("=" * 70)
         lines.append("📋 ПОДРОБНАЯ АНКЕТА ПАЦИЕНТА (Клинический опрос v2.0)")
@@ -1184,8 +1412,8 @@ class ReportGenerator:
     
     def _generate_header(self, patient_name: Optional[str]) -> str:
         """Генерация заголовка отчёта."""
-        name = patient_name or "Не указано"
-        date = datetime.now().strftime("%d.%m.%Y %H:%M")
+        name = _html_escape(patient_name or "Не указано")
+        date = self._report_date()
         
         return (
             f"<b>📋 АНКЕТА ПАЦИЕНТА</b> (Предварительный опрос)<br>"
@@ -1193,163 +1421,228 @@ class ReportGenerator:
             f"<b>Дата:</b> {date}"
         )
     
-    def _generate_main_complaint(self, answers: Dict[str, Any]) -> Optional[str]:
-        """Генерация блока основной жалобы."""
-        # Ищем ответ на вопрос об основной причине обращения
-        main_trigger = answers.get("main_trigger", {})
+    # ============================================
+    # Общие блоки v1: данные разбираются один раз, а разметка
+    # для "html" (Битрикс), "readable" (PDF) и "text" берётся из таблиц
+    # ============================================
+
+    # Строка основной жалобы; {} — подпись причины обращения
+    MAIN_COMPLAINT_TEMPLATES = {
+        "html": "📌 <b>ОСНОВНАЯ ПРИЧИНА ОБРАЩЕНИЯ:</b> {}",
+        "readable": "<h2>📌 Основная причина обращения</h2><p><strong>{}</strong></p>",
+        "text": "📌 ОСНОВНАЯ ПРИЧИНА ОБРАЩЕНИЯ\n{}",
+    }
+    # Блок боли: (заголовок, строка локализации, строка интенсивности, разделитель)
+    PAIN_DETAILS_LAYOUTS = {
+        "html": (
+            "🩺 <b>ХАРАКТЕРИСТИКА БОЛИ:</b>",
+            "• <b>Локализация:</b> {}",
+            "• <b>Интенсивность:</b> {}/10",
+            "<br>",
+        ),
+        "readable": (
+            "<h2>🩺 Характеристика боли</h2>",
+            "<p><strong>Локализация:</strong> {}</p>",
+            '<p><strong>Интенсивность:</strong> <span class="intensity-badge">{}/10</span></p>',
+            "",
+        ),
+        "text": (
+            "🩺 ХАРАКТЕРИСТИКА БОЛИ",
+            "  • Локализация: {}",
+            "  • Интенсивность: {}/10",
+            "\n",
+        ),
+    }
+    # Блок факторов риска: (заголовок, строка фактора, окончание списка,
+    # строка деталей аллергии, разделитель)
+    RISK_FACTORS_LAYOUTS = {
+        "html": (
+            "💊 <b>ФАКТОРЫ РИСКА (Anamnesis Vitae):</b>",
+            "• {}",
+            "",
+            "  └ Детали: {}",
+            "<br>",
+        ),
+        "readable": (
+            "<h2>💊 Факторы риска (Anamnesis Vitae)</h2><ul>",
+            "<li><strong>{}</strong></li>",
+            "</ul>",
+            "<p><em>Детали аллергии: {}</em></p>",
+            "",
+        ),
+        "text": (
+            "💊 ФАКТОРЫ РИСКА (Anamnesis Vitae)",
+            "  • {}",
+            "",
+            "    └ Детали: {}",
+            "\n",
+        ),
+    }
+
+    def _render_main_complaint(self, answers: Dict[str, Any], fmt: str) -> Optional[str]:
+        """Блок основной причины обращения в формате fmt."""
+        main_trigger = answers.get("main_trigger") or _EMPTY_ANSWER
         selected = main_trigger.get("selected")
-        
+
         if not selected:
             return None
-        
-        complaints_map = {
-            "pain": "Беспокоит боль",
-            "discomfort": "Общее недомогание / Дискомфорт",
-            "checkup": "Плановый осмотр / Справка / Анализы",
-        }
-        
-        complaint_text = complaints_map.get(selected, selected)
-        
-        return f"📌 <b>ОСНОВНАЯ ПРИЧИНА ОБРАЩЕНИЯ:</b> {complaint_text}"
-    
-    def _generate_pain_details(self, answers: Dict[str, Any]) -> Optional[str]:
-        """Генерация блока детализации боли."""
-        pain_data = answers.get("pain_details", {})
-        
+
+        complaint_text = self.MAIN_COMPLAINT_LABELS.get(selected)
+        if complaint_text is None:
+            # Неизвестное значение выводится как прислал клиент,
+            # поэтому в HTML-форматах экранируется
+            complaint_text = _html_escape(str(selected)) if fmt != "text" else selected
+        return self.MAIN_COMPLAINT_TEMPLATES[fmt].format(complaint_text)
+
+    def _render_pain_details(self, answers: Dict[str, Any], fmt: str) -> Optional[str]:
+        """Блок детализации боли в формате fmt."""
+        pain_data = answers.get("pain_details") or _EMPTY_ANSWER
+
         if not pain_data:
             return None
-        
-        parts = ["🩺 <b>ХАРАКТЕРИСТИКА БОЛИ:</b>"]
-        
+
+        header, location_line, intensity_line, separator = self.PAIN_DETAILS_LAYOUTS[fmt]
+        parts = [header]
+        # Неизвестные зоны и интенсивность выводятся как прислал клиент,
+        # поэтому в HTML-форматах экранируются
+        escape = _html_escape if fmt != "text" else str
+
         # Локализация
         loc_names = self._format_body_locations(pain_data.get("locations"))
         if loc_names:
-            parts.append(f"• <b>Локализация:</b> {loc_names}")
-        
+            parts.append(location_line.format(escape(loc_names)))
+
         # Интенсивность
         intensity = pain_data.get("intensity")
         if intensity:
-            parts.append(f"• <b>Интенсивность:</b> {intensity}/10")
-        
-        return "<br>".join(parts)
+            parts.append(intensity_line.format(escape(str(intensity))))
+
+        return separator.join(parts)
+
+    def _render_risk_factors(self, answers: Dict[str, Any], fmt: str) -> Optional[str]:
+        """Блок факторов риска в формате fmt."""
+        risk_data = answers.get("risk_factors") or _EMPTY_ANSWER
+        selected = risk_data.get("selected") or ()
+
+        if not selected or "none" in selected:
+            return None
+
+        header, factor_line, list_end, details_line, separator = self.RISK_FACTORS_LAYOUTS[fmt]
+        parts = [header]
+
+        factor_line_format = factor_line.format
+        parts.extend(
+            factor_line_format(label)
+            for label in map(self.RISK_FACTOR_LABELS.get, selected)
+            if label is not None
+        )
+
+        if list_end:
+            parts.append(list_end)
+
+        # Детали аллергии
+        allergy_details = risk_data.get("allergy_details")
+        if allergy_details:
+            # Свободный текст пациента: в HTML-форматах экранируется
+            if fmt != "text":
+                allergy_details = _html_escape(str(allergy_details))
+            parts.append(details_line.format(allergy_details))
+
+        return separator.join(parts)
+
+    def _generate_main_complaint(self, answers: Dict[str, Any]) -> Optional[str]:
+        """Генерация блока основной жалобы."""
+        return self._render_main_complaint(answers, "html")
+    
+    def _generate_pain_details(self, answers: Dict[str, Any]) -> Optional[str]:
+        """Генерация блока детализации боли."""
+        return self._render_pain_details(answers, "html")
     
     def _generate_systems_screening(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока скрининга систем (только положительные находки)."""
-        screening = answers.get("systems_screening", {})
-        selected_systems = screening.get("selected", [])
+        screening = answers.get("systems_screening") or _EMPTY_ANSWER
+        selected_systems = screening.get("selected") or ()
         
         if not selected_systems or "none" in selected_systems:
             return None
         
-        parts = []
+        # Все строки блока в одном списке: пустая строка между разделами
+        # превращается в «<br><br>» при итоговом join
+        lines: List[str] = []
         
         # Дыхательная система
         if "respiratory" in selected_systems:
-            respiratory_details = answers.get("respiratory_details", {})
-            resp_selected = respiratory_details.get("selected", [])
+            respiratory_details = answers.get("respiratory_details") or _EMPTY_ANSWER
+            resp_selected = respiratory_details.get("selected") or ()
             
             if resp_selected:
-                resp_parts = ["🫁 <b>ДЫХАТЕЛЬНАЯ СИСТЕМА:</b>"]
-                symptoms_map = {
-                    "dry_cough": "Кашель сухой",
-                    "wet_cough": "Кашель с мокротой",
-                    "dyspnea_walking": "Одышка при ходьбе",
-                    "asthma_attacks": "Приступы удушья",
-                }
-                for symptom in resp_selected:
-                    if symptom in symptoms_map:
-                        resp_parts.append(f"• {symptoms_map[symptom]}")
+                lines.append("🫁 <b>ДЫХАТЕЛЬНАЯ СИСТЕМА:</b>")
+                symptoms_map = self.RESPIRATORY_SYMPTOM_LABELS
+                labels = [label for label in map(symptoms_map.get, resp_selected) if label is not None]
+                if labels:
+                    lines.append("• " + "<br>• ".join(labels))
                 
                 # Курение
                 smoking_years = respiratory_details.get("smoking_years")
                 if smoking_years and smoking_years > 0:
-                    resp_parts.append(f"• 🚬 Стаж курения: {smoking_years} лет")
-                
-                parts.append("<br>".join(resp_parts))
+                    lines.append(f"• 🚬 Стаж курения: {smoking_years} лет")
         
         # Сердечно-сосудистая система
         if "cardio" in selected_systems:
-            cardio_details = answers.get("cardio_details", {})
+            cardio_details = answers.get("cardio_details") or _EMPTY_ANSWER
             cardio_selected = cardio_details.get("selected")
             
             if cardio_selected:
-                cardio_parts = ["❤️ <b>СЕРДЕЧНО-СОСУДИСТАЯ СИСТЕМА:</b>"]
-                timing_map = {
-                    "exercise": "Симптомы при физической нагрузке",
-                    "rest": "Симптомы в покое / Ночью",
-                    "constant": "Симптомы постоянно",
-                }
-                if cardio_selected in timing_map:
-                    cardio_parts.append(f"• {timing_map[cardio_selected]}")
+                if lines:
+                    lines.append("")
+                lines.append("❤️ <b>СЕРДЕЧНО-СОСУДИСТАЯ СИСТЕМА:</b>")
+                timing_label = self.CARDIO_TIMING_LABELS.get(cardio_selected)
+                if timing_label is not None:
+                    lines.append(f"• {timing_label}")
                 
                 # Отёки
                 edema = cardio_details.get("edema")
                 if edema and edema != "none":
-                    edema_map = {"legs": "Отёки на ногах", "face": "Отёки на лице"}
-                    cardio_parts.append(f"• {edema_map.get(edema, edema)}")
-                
-                parts.append("<br>".join(cardio_parts))
+                    edema_map = self.EDEMA_LABELS
+                    # Неизвестное значение выводится как есть, поэтому экранируется
+                    lines.append(f"• {_html_escape(str(edema_map.get(edema, edema)))}")
         
         # Пищеварительная система
         if "gastro" in selected_systems:
-            gastro_details = answers.get("gastro_details", {})
-            gastro_selected = gastro_details.get("selected", [])
+            gastro_details = answers.get("gastro_details") or _EMPTY_ANSWER
+            gastro_selected = gastro_details.get("selected") or ()
             
             if gastro_selected:
-                gastro_parts = ["🍽️ <b>ПИЩЕВАРИТЕЛЬНАЯ СИСТЕМА:</b>"]
-                symptoms_map = {
-                    "hungry_pain": "Боли 'голодные' или ночные",
-                    "after_meal_pain": "Боли после еды",
-                    "constipation": "Запоры",
-                    "diarrhea": "Диарея",
-                    "nausea": "Тошнота/Рвота",
-                }
-                for symptom in gastro_selected:
-                    if symptom in symptoms_map:
-                        gastro_parts.append(f"• {symptoms_map[symptom]}")
-                
-                parts.append("<br>".join(gastro_parts))
+                if lines:
+                    lines.append("")
+                lines.append("🍽️ <b>ПИЩЕВАРИТЕЛЬНАЯ СИСТЕМА:</b>")
+                symptoms_map = self.GASTRO_SYMPTOM_LABELS
+                labels = [label for label in map(symptoms_map.get, gastro_selected) if label is not None]
+                if labels:
+                    lines.append("• " + "<br>• ".join(labels))
         
         # Неврология
         if "neuro" in selected_systems:
-            parts.append("🧠 <b>НЕВРОЛОГИЯ:</b><br>• Головные боли, головокружение, нарушения сна")
+            if lines:
+                lines.append("")
+            lines.append("🧠 <b>НЕВРОЛОГИЯ:</b>")
+            lines.append("• Головные боли, головокружение, нарушения сна")
         
         # Мочевыделительная система
         if "urinary" in selected_systems:
-            parts.append("💧 <b>МОЧЕВЫДЕЛИТЕЛЬНАЯ СИСТЕМА:</b><br>• Боли в пояснице, проблемы с мочеиспусканием")
+            if lines:
+                lines.append("")
+            lines.append("💧 <b>МОЧЕВЫДЕЛИТЕЛЬНАЯ СИСТЕМА:</b>")
+            lines.append("• Боли в пояснице, проблемы с мочеиспусканием")
         
-        if not parts:
+        if not lines:
             return None
         
-        return "<br><br>".join(parts)
+        return "<br>".join(lines)
     
     def _generate_risk_factors(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока факторов риска."""
-        risk_data = answers.get("risk_factors", {})
-        selected = risk_data.get("selected", [])
-        
-        if not selected or "none" in selected:
-            return None
-        
-        parts = ["💊 <b>ФАКТОРЫ РИСКА (Anamnesis Vitae):</b>"]
-        
-        factors_map = {
-            "allergy": "⚠️ Аллергия на лекарства или продукты",
-            "diabetes": "Сахарный диабет (личный или семейный анамнез)",
-            "oncology": "🧬 Онкология у кровных родственников",
-            "cardiovascular": "Инфаркты/Инсульты у родителей до 60 лет",
-        }
-        
-        for factor in selected:
-            if factor in factors_map:
-                parts.append(f"• {factors_map[factor]}")
-        
-        # Детали аллергии
-        allergy_details = risk_data.get("allergy_details")
-        if allergy_details:
-            parts.append(f"  └ Детали: {allergy_details}")
-        
-        return "<br>".join(parts)
+        return self._render_risk_factors(answers, "html")
     
     # ============================================
     # Методы для читаемого HTML формата
@@ -1357,70 +1650,36 @@ class ReportGenerator:
     
     def _generate_readable_main_complaint(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока основной жалобы для читаемого формата."""
-        main_trigger = answers.get("main_trigger", {})
-        selected = main_trigger.get("selected")
-        
-        if not selected:
-            return None
-        
-        complaints_map = {
-            "pain": "Беспокоит боль",
-            "discomfort": "Общее недомогание / Дискомфорт",
-            "checkup": "Плановый осмотр / Справка / Анализы",
-        }
-        
-        complaint_text = complaints_map.get(selected, selected)
-        
-        return f"<h2>📌 Основная причина обращения</h2><p><strong>{complaint_text}</strong></p>"
+        return self._render_main_complaint(answers, "readable")
     
     def _generate_readable_pain_details(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока детализации боли для читаемого формата."""
-        pain_data = answers.get("pain_details", {})
-        
-        if not pain_data:
-            return None
-        
-        parts = ["<h2>🩺 Характеристика боли</h2>"]
-        
-        # Локализация
-        loc_names = self._format_body_locations(pain_data.get("locations"))
-        if loc_names:
-            parts.append(f"<p><strong>Локализация:</strong> {loc_names}</p>")
-        
-        # Интенсивность
-        intensity = pain_data.get("intensity")
-        if intensity:
-            parts.append(f'<p><strong>Интенсивность:</strong> <span class="intensity-badge">{intensity}/10</span></p>')
-        
-        return "".join(parts)
+        return self._render_pain_details(answers, "readable")
     
     def _generate_readable_systems_screening(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока скрининга систем для читаемого формата."""
-        screening = answers.get("systems_screening", {})
-        selected_systems = screening.get("selected", [])
+        screening = answers.get("systems_screening") or _EMPTY_ANSWER
+        selected_systems = screening.get("selected") or ()
         
         if not selected_systems or "none" in selected_systems:
             return None
         
-        parts = ["<h2>🔍 Скрининг систем организма</h2>"]
-        parts.append("<p><em>Выявленные отклонения (только положительные находки):</em></p>")
+        parts = [
+            "<h2>🔍 Скрининг систем организма</h2>"
+            "<p><em>Выявленные отклонения (только положительные находки):</em></p>"
+        ]
         
         # Дыхательная система
         if "respiratory" in selected_systems:
-            respiratory_details = answers.get("respiratory_details", {})
-            resp_selected = respiratory_details.get("selected", [])
+            respiratory_details = answers.get("respiratory_details") or _EMPTY_ANSWER
+            resp_selected = respiratory_details.get("selected") or ()
             
             if resp_selected:
                 parts.append("<h3>🫁 Дыхательная система</h3><ul>")
-                symptoms_map = {
-                    "dry_cough": "Кашель сухой",
-                    "wet_cough": "Кашель с мокротой",
-                    "dyspnea_walking": "Одышка при ходьбе",
-                    "asthma_attacks": "Приступы удушья",
-                }
-                for symptom in resp_selected:
-                    if symptom in symptoms_map:
-                        parts.append(f"<li>{symptoms_map[symptom]}</li>")
+                symptoms_map = self.RESPIRATORY_SYMPTOM_LABELS
+                labels = [label for label in map(symptoms_map.get, resp_selected) if label is not None]
+                if labels:
+                    parts.append("<li>" + "</li><li>".join(labels) + "</li>")
                 
                 smoking_years = respiratory_details.get("smoking_years")
                 if smoking_years and smoking_years > 0:
@@ -1430,89 +1689,56 @@ class ReportGenerator:
         
         # Сердечно-сосудистая система
         if "cardio" in selected_systems:
-            cardio_details = answers.get("cardio_details", {})
+            cardio_details = answers.get("cardio_details") or _EMPTY_ANSWER
             cardio_selected = cardio_details.get("selected")
             
             if cardio_selected:
                 parts.append("<h3>❤️ Сердечно-сосудистая система</h3><ul>")
-                timing_map = {
-                    "exercise": "Симптомы при физической нагрузке",
-                    "rest": "Симптомы в покое / Ночью",
-                    "constant": "Симптомы постоянно",
-                }
-                if cardio_selected in timing_map:
-                    parts.append(f"<li>{timing_map[cardio_selected]}</li>")
+                timing_label = self.CARDIO_TIMING_LABELS.get(cardio_selected)
+                if timing_label is not None:
+                    parts.append(f"<li>{timing_label}</li>")
                 
                 edema = cardio_details.get("edema")
                 if edema and edema != "none":
-                    edema_map = {"legs": "Отёки на ногах", "face": "Отёки на лице"}
-                    parts.append(f"<li>{edema_map.get(edema, edema)}</li>")
+                    edema_map = self.EDEMA_LABELS
+                    # Неизвестное значение выводится как есть, поэтому экранируется
+                    parts.append(f"<li>{_html_escape(str(edema_map.get(edema, edema)))}</li>")
                 
                 parts.append("</ul>")
         
         # Пищеварительная система
         if "gastro" in selected_systems:
-            gastro_details = answers.get("gastro_details", {})
-            gastro_selected = gastro_details.get("selected", [])
+            gastro_details = answers.get("gastro_details") or _EMPTY_ANSWER
+            gastro_selected = gastro_details.get("selected") or ()
             
             if gastro_selected:
                 parts.append("<h3>🍽️ Пищеварительная система</h3><ul>")
-                symptoms_map = {
-                    "hungry_pain": "Боли 'голодные' или ночные",
-                    "after_meal_pain": "Боли после еды",
-                    "constipation": "Запоры",
-                    "diarrhea": "Диарея",
-                    "nausea": "Тошнота/Рвота",
-                }
-                for symptom in gastro_selected:
-                    if symptom in symptoms_map:
-                        parts.append(f"<li>{symptoms_map[symptom]}</li>")
+                symptoms_map = self.GASTRO_SYMPTOM_LABELS
+                labels = [label for label in map(symptoms_map.get, gastro_selected) if label is not None]
+                if labels:
+                    parts.append("<li>" + "</li><li>".join(labels) + "</li>")
                 
                 parts.append("</ul>")
         
         # Неврология
         if "neuro" in selected_systems:
-            parts.append("<h3>🧠 Неврология</h3><ul>")
-            parts.append("<li>Головные боли, головокружение, нарушения сна</li>")
-            parts.append("</ul>")
+            parts.append(
+                "<h3>🧠 Неврология</h3>"
+                "<ul><li>Головные боли, головокружение, нарушения сна</li></ul>"
+            )
         
         # Мочевыделительная система
         if "urinary" in selected_systems:
-            parts.append("<h3>💧 Мочевыделительная система</h3><ul>")
-            parts.append("<li>Боли в пояснице, проблемы с мочеиспусканием</li>")
-            parts.append("</ul>")
+            parts.append(
+                "<h3>💧 Мочевыделительная система</h3>"
+                "<ul><li>Боли в пояснице, проблемы с мочеиспусканием</li></ul>"
+            )
         
         return "".join(parts)
     
     def _generate_readable_risk_factors(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока факторов риска для читаемого формата."""
-        risk_data = answers.get("risk_factors", {})
-        selected = risk_data.get("selected", [])
-        
-        if not selected or "none" in selected:
-            return None
-        
-        parts = ["<h2>💊 Факторы риска (Anamnesis Vitae)</h2><ul>"]
-        
-        factors_map = {
-            "allergy": "⚠️ Аллергия на лекарства или продукты",
-            "diabetes": "Сахарный диабет (личный или семейный анамнез)",
-            "oncology": "🧬 Онкология у кровных родственников",
-            "cardiovascular": "Инфаркты/Инсульты у родителей до 60 лет",
-        }
-        
-        for factor in selected:
-            if factor in factors_map:
-                parts.append(f"<li><strong>{factors_map[factor]}</strong></li>")
-        
-        parts.append("</ul>")
-        
-        # Детали аллергии
-        allergy_details = risk_data.get("allergy_details")
-        if allergy_details:
-            parts.append(f"<p><em>Детали аллергии: {allergy_details}</em></p>")
-        
-        return "".join(parts)
+        return self._render_risk_factors(answers, "readable")
     
     # ============================================
     # Методы для текстового формата
@@ -1520,69 +1746,37 @@ class ReportGenerator:
     
     def _generate_text_main_complaint(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока основной жалобы для текстового формата."""
-        main_trigger = answers.get("main_trigger", {})
-        selected = main_trigger.get("selected")
-        
-        if not selected:
-            return None
-        
-        complaints_map = {
-            "pain": "Беспокоит боль",
-            "discomfort": "Общее недомогание / Дискомфорт",
-            "checkup": "Плановый осмотр / Справка / Анализы",
-        }
-        
-        complaint_text = complaints_map.get(selected, selected)
-        
-        return f"📌 ОСНОВНАЯ ПРИЧИНА ОБРАЩЕНИЯ\n{complaint_text}"
+        return self._render_main_complaint(answers, "text")
     
     def _generate_text_pain_details(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока детализации боли для текстового формата."""
-        pain_data = answers.get("pain_details", {})
-        
-        if not pain_data:
-            return None
-        
-        lines = ["🩺 ХАРАКТЕРИСТИКА БОЛИ"]
-        
-        loc_names = self._format_body_locations(pain_data.get("locations"))
-        if loc_names:
-            lines.append(f"  • Локализация: {loc_names}")
-        
-        intensity = pain_data.get("intensity")
-        if intensity:
-            lines.append(f"  • Интенсивность: {intensity}/10")
-        
-        return "\n".join(lines)
+        return self._render_pain_details(answers, "text")
     
     def _generate_text_systems_screening(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока скрининга систем для текстового формата."""
-        screening = answers.get("systems_screening", {})
-        selected_systems = screening.get("selected", [])
+        screening = answers.get("systems_screening") or _EMPTY_ANSWER
+        selected_systems = screening.get("selected") or ()
         
         if not selected_systems or "none" in selected_systems:
             return None
         
-        lines = ["🔍 СКРИНИНГ СИСТЕМ ОРГАНИЗМА"]
-        lines.append("(Выявленные отклонения - только положительные находки)")
-        lines.append("")
+        lines = [
+            "🔍 СКРИНИНГ СИСТЕМ ОРГАНИЗМА",
+            "(Выявленные отклонения - только положительные находки)",
+            "",
+        ]
         
         # Дыхательная система
         if "respiratory" in selected_systems:
-            respiratory_details = answers.get("respiratory_details", {})
-            resp_selected = respiratory_details.get("selected", [])
+            respiratory_details = answers.get("respiratory_details") or _EMPTY_ANSWER
+            resp_selected = respiratory_details.get("selected") or ()
             
             if resp_selected:
                 lines.append("🫁 Дыхательная система:")
-                symptoms_map = {
-                    "dry_cough": "Кашель сухой",
-                    "wet_cough": "Кашель с мокротой",
-                    "dyspnea_walking": "Одышка при ходьбе",
-                    "asthma_attacks": "Приступы удушья",
-                }
-                for symptom in resp_selected:
-                    if symptom in symptoms_map:
-                        lines.append(f"  • {symptoms_map[symptom]}")
+                symptoms_map = self.RESPIRATORY_SYMPTOM_LABELS
+                labels = [label for label in map(symptoms_map.get, resp_selected) if label is not None]
+                if labels:
+                    lines.append("  • " + "\n  • ".join(labels))
                 
                 smoking_years = respiratory_details.get("smoking_years")
                 if smoking_years and smoking_years > 0:
@@ -1592,43 +1786,33 @@ class ReportGenerator:
         
         # Сердечно-сосудистая система
         if "cardio" in selected_systems:
-            cardio_details = answers.get("cardio_details", {})
+            cardio_details = answers.get("cardio_details") or _EMPTY_ANSWER
             cardio_selected = cardio_details.get("selected")
             
             if cardio_selected:
                 lines.append("❤️ Сердечно-сосудистая система:")
-                timing_map = {
-                    "exercise": "Симптомы при физической нагрузке",
-                    "rest": "Симптомы в покое / Ночью",
-                    "constant": "Симптомы постоянно",
-                }
-                if cardio_selected in timing_map:
-                    lines.append(f"  • {timing_map[cardio_selected]}")
+                timing_label = self.CARDIO_TIMING_LABELS.get(cardio_selected)
+                if timing_label is not None:
+                    lines.append(f"  • {timing_label}")
                 
                 edema = cardio_details.get("edema")
                 if edema and edema != "none":
-                    edema_map = {"legs": "Отёки на ногах", "face": "Отёки на лице"}
+                    edema_map = self.EDEMA_LABELS
                     lines.append(f"  • {edema_map.get(edema, edema)}")
                 
                 lines.append("")
         
         # Пищеварительная система
         if "gastro" in selected_systems:
-            gastro_details = answers.get("gastro_details", {})
-            gastro_selected = gastro_details.get("selected", [])
+            gastro_details = answers.get("gastro_details") or _EMPTY_ANSWER
+            gastro_selected = gastro_details.get("selected") or ()
             
             if gastro_selected:
                 lines.append("🍽️ Пищеварительная система:")
-                symptoms_map = {
-                    "hungry_pain": "Боли 'голодные' или ночные",
-                    "after_meal_pain": "Боли после еды",
-                    "constipation": "Запоры",
-                    "diarrhea": "Диарея",
-                    "nausea": "Тошнота/Рвота",
-                }
-                for symptom in gastro_selected:
-                    if symptom in symptoms_map:
-                        lines.append(f"  • {symptoms_map[symptom]}")
+                symptoms_map = self.GASTRO_SYMPTOM_LABELS
+                labels = [label for label in map(symptoms_map.get, gastro_selected) if label is not None]
+                if labels:
+                    lines.append("  • " + "\n  • ".join(labels))
                 
                 lines.append("")
         
@@ -1648,27 +1832,4 @@ class ReportGenerator:
     
     def _generate_text_risk_factors(self, answers: Dict[str, Any]) -> Optional[str]:
         """Генерация блока факторов риска для текстового формата."""
-        risk_data = answers.get("risk_factors", {})
-        selected = risk_data.get("selected", [])
-        
-        if not selected or "none" in selected:
-            return None
-        
-        lines = ["💊 ФАКТОРЫ РИСКА (Anamnesis Vitae)"]
-        
-        factors_map = {
-            "allergy": "⚠️ Аллергия на лекарства или продукты",
-            "diabetes": "Сахарный диабет (личный или семейный анамнез)",
-            "oncology": "🧬 Онкология у кровных родственников",
-            "cardiovascular": "Инфаркты/Инсульты у родителей до 60 лет",
-        }
-        
-        for factor in selected:
-            if factor in factors_map:
-                lines.append(f"  • {factors_map[factor]}")
-        
-        allergy_details = risk_data.get("allergy_details")
-        if allergy_details:
-            lines.append(f"    └ Детали: {allergy_details}")
-        
-        return "\n".join(lines)
+        return self._render_risk_factors(answers, "text")
@@ -26,77 +26,80 @@ async def backfill_clinic_buckets(batch_size: int = 100, only_missing: bool = Fa
     bitrix_client = Bitrix24Client()
     offset = 0
 
-    async with async_session_maker() as db:
-        while True:
-            stmt = select(SurveySession).where(SurveySession.status == "completed")
-            if only_missing:
-                stmt = stmt.where(
-                    (SurveySession.portal_clinic_bucket.is_(None))
-                    | (SurveySession.bitrix_category_id.is_(None))
-                )
-
-            stmt = stmt.order_by(SurveySession.completed_at.asc().nullsfirst(), SurveySession.started_at.asc())
-            if not only_missing:
-                stmt = stmt.offset(offset)
-            stmt = stmt.limit(batch_size)
-
-            result = await db.execute(stmt)
-            sessions = result.scalars().all()
-            if not sessions:
-                break
-
-            for session in sessions:
-                stats["processed"] += 1
-                try:
-                    deal_data = None
-                    if session.lead_id:
-                        deal_data = await bitrix_client.get_deal(session.lead_id)
-                        if isinstance(deal_data, dict) and "ID" not in deal_data:
-                            deal_data["ID"] = session.lead_id
-
-                    category_id, clinic_bucket = bitrix_client.extract_portal_routing_from_deal(deal_data)
-                    appointment_at = bitrix_client.extract_appointment_datetime_from_deal(deal_data)
-                    doctor_name = await bitrix_client.resolve_doctor_name_from_deal_data(deal_data)
-                    if doctor_name is None:
-                        doctor_name = bitrix_client.extract_doctor_name_from_deal(deal_data)
-
-                    changed = False
-                    if session.bitrix_category_id != category_id:
-                        session.bitrix_category_id = category_id
-                        changed = True
-                    if session.portal_clinic_bucket != clinic_bucket:
-                        session.portal_clinic_bucket = clinic_bucket
-                        changed = True
-                    if doctor_name and session.doctor_name != doctor_name:
-                        session.doctor_name = doctor_name
-                        changed = True
-                    if session.appointment_at != appointment_at:
-                        session.appointment_at = appointment_at
-                        stats["appointment_updated"] += 1
-                        changed = True
-
-                    if clinic_bucket == Bitrix24Client.DEFAULT_PORTAL_CLINIC_BUCKET:
-                        stats["routed_to_test"] += 1
-
-                    if changed:
-                        stats["updated"] += 1
-
-                except Exception as exc:
-                    stats["errors"] += 1
-                    logger.exception(
-                        "Не удалось обработать сессию doctor portal: "
-                        f"session_id={session.id}, lead_id={session.lead_id}, error={exc}"
+    try:
+        async with async_session_maker() as db:
+            while True:
+                stmt = select(SurveySession).where(SurveySession.status == "completed")
+                if only_missing:
+                    stmt = stmt.where(
+                        (SurveySession.portal_clinic_bucket.is_(None))
+                        | (SurveySession.bitrix_category_id.is_(None))
                     )
 
-            await db.commit()
-            logger.info(
-                "Backfill doctor portal: "
-                f"processed={stats['processed']}, updated={stats['updated']}, "
-                f"appointment_updated={stats['appointment_updated']}, "
-                f"test={stats['routed_to_test']}, errors={stats['errors']}"
-            )
-            if not only_missing:
-                offset += batch_size
+                stmt = stmt.order_by(SurveySession.completed_at.asc().nullsfirst(), SurveySession.started_at.asc())
+                if not only_missing:
+                    stmt = stmt.offset(offset)
+                stmt = stmt.limit(batch_size)
+
+                result = await db.execute(stmt)
+                sessions = result.scalars().all()
+                if not sessions:
+                    break
+
+                for session in sessions:
+                    stats["processed"] += 1
+                    try:
+                        deal_data = None
+                        if session.lead_id:
+                            deal_data = await bitrix_client.get_deal(session.lead_id)
+                            if isinstance(deal_data, dict) and "ID" not in deal_data:
+                                deal_data["ID"] = session.lead_id
+
+                        category_id, clinic_bucket = bitrix_client.extract_portal_routing_from_deal(deal_data)
+                        appointment_at = bitrix_client.extract_appointment_datetime_from_deal(deal_data)
+                        doctor_name = await bitrix_client.resolve_doctor_name_from_deal_data(deal_data)
+                        if doctor_name is None:
+                            doctor_name = bitrix_client.extract_doctor_name_from_deal(deal_data)
+
+                        changed = False
+                        if session.bitrix_category_id != category_id:
+                            session.bitrix_category_id = category_id
+                            changed = True
+                        if session.portal_clinic_bucket != clinic_bucket:
+                            session.portal_clinic_bucket = clinic_bucket
+                            changed = True
+                        if doctor_name and session.doctor_name != doctor_name:
+                            session.doctor_name = doctor_name
+                            changed = True
+                        if session.appointment_at != appointment_at:
+                            session.appointment_at = appointment_at
+                            stats["appointment_updated"] += 1
+                            changed = True
+
+                        if clinic_bucket == Bitrix24Client.DEFAULT_PORTAL_CLINIC_BUCKET:
+                            stats["routed_to_test"] += 1
+
+                        if changed:
+                            stats["updated"] += 1
+
+                    except Exception as exc:
+                        stats["errors"] += 1
+                        logger.exception(
+                            "Не удалось обработать сессию doctor portal: "
+                            f"session_id={session.id}, lead_id={session.lead_id}, error={exc}"
+                        )
+
+                await db.commit()
+                logger.info(
+                    "Backfill doctor portal: "
+                    f"processed={stats['processed']}, updated={stats['updated']}, "
+                    f"appointment_updated={stats['appointment_updated']}, "
+                    f"test={stats['routed_to_test']}, errors={stats['errors']}"
+                )
+                if not only_missing:
+                    offset += batch_size
+    finally:
+        await bitrix_client.aclose()
 
     return stats
 
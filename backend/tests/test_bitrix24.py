@@ -0,0 +1,425 @@
+import asyncio
+import json
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from app.core.config import settings
+from app.services.bitrix24 import Bitrix24Batcher, Bitrix24Client
+
+
+class Bitrix24ClientTransportTests(unittest.TestCase):
+    def test_reuses_single_http_client_between_calls(self) -> None:
+        async def scenario() -> None:
+            client = Bitrix24Client("https://example.invalid/rest")
+            first = await client._get_client()
+            second = await client._get_client()
+
+            self.assertIs(first, second)
+
+            await client.aclose()
+            self.assertTrue(first.is_closed)
+
+            third = await client._get_client()
+            self.assertIsNot(first, third)
+            await client.aclose()
+
+        asyncio.run(scenario())
+
+    def test_methods_are_noop_without_webhook(self) -> None:
+        async def scenario() -> tuple:
+            with patch.object(settings, "BITRIX24_WEBHOOK_URL", ""):
+                client = Bitrix24Client()
+            return (
+                await client.get_deal(5),
+                await client.send_comment(5, "DEAL", "Отчёт"),
+                client._client,
+            )
+
+        deal, comment_sent, http_client = asyncio.run(scenario())
+
+        self.assertIsNone(deal)
+        self.assertFalse(comment_sent)
+        self.assertIsNone(http_client)
+
+    def test_requests_go_through_persistent_client(self) -> None:
+        requested_urls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_urls.append(str(request.url))
+            return httpx.Response(200, json={"result": {"ID": "5", "CONTACT_ID": "7"}})
+
+        async def scenario() -> None:
+            client = Bitrix24Client("https://example.invalid/rest/")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+            first = await client.get_deal(5)
+            second = await client.get_contact(7)
+
+            self.assertEqual(first["ID"], "5")
+            self.assertEqual(second["CONTACT_ID"], "7")
+            await client.aclose()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(
+            requested_urls,
+            [
+                "https://example.invalid/rest/crm.deal.get",
+                "https://example.invalid/rest/crm.contact.get",
+            ],
+        )
+
+
+class Bitrix24RetryTests(unittest.TestCase):
+    def _run_with_statuses(self, method: str, statuses: list[int]) -> tuple[list[str], object]:
+        responses = iter(statuses)
+        requested_urls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_urls.append(str(request.url))
+            return httpx.Response(next(responses), json={"result": {"ID": "5"}})
+
+        async def scenario() -> object:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client._post_json(method, {"id": 5})
+            finally:
+                await client.aclose()
+
+        with patch.object(Bitrix24Client, "_retry_delay", return_value=0):
+            outcome = asyncio.run(scenario())
+        return requested_urls, outcome
+
+    def test_retries_rate_limited_write(self) -> None:
+        requested_urls, outcome = self._run_with_statuses("crm.deal.update", [503, 429, 200])
+
+        self.assertEqual(len(requested_urls), 3)
+        self.assertEqual(outcome, {"result": {"ID": "5"}})
+
+    def test_does_not_retry_write_on_gateway_error(self) -> None:
+        requested_urls, outcome = self._run_with_statuses("crm.deal.update", [502, 200])
+
+        self.assertEqual(len(requested_urls), 1)
+        self.assertIsNone(outcome)
+
+    def test_retries_read_on_gateway_error(self) -> None:
+        requested_urls, outcome = self._run_with_statuses("crm.deal.get", [502, 200])
+
+        self.assertEqual(len(requested_urls), 2)
+        self.assertEqual(outcome, {"result": {"ID": "5"}})
+
+    def test_unexpected_errors_return_none(self) -> None:
+        requested_urls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_urls.append(str(request.url))
+            return httpx.Response(200, json={"result": True})
+
+        async def scenario() -> tuple[object, object]:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                unserializable = await client._post_json("crm.deal.update", {"id": 2**70})
+                bad_url = Bitrix24Client("https://\x00invalid/rest")
+                bad_url._client = client._client
+                return unserializable, await bad_url._post_json("crm.deal.get", {"id": 5})
+            finally:
+                await client.aclose()
+
+        unserializable, bad_url_outcome = asyncio.run(scenario())
+
+        self.assertIsNone(unserializable)
+        self.assertIsNone(bad_url_outcome)
+        self.assertEqual(requested_urls, [])
+
+
+class Bitrix24EntityCacheTests(unittest.TestCase):
+    def test_caches_deal_until_it_is_updated(self) -> None:
+        requested_urls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_urls.append(str(request.url))
+            return httpx.Response(200, json={"result": {"ID": "5", "CATEGORY_ID": "1"}})
+
+        async def scenario() -> None:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                first = await client.get_deal(5)
+                first["ID"] = "changed by caller"
+                second = await client.get_deal(5)
+                self.assertEqual(second["ID"], "5")
+
+                await client.update_deal_field(5, {"UF_CRM_1": "да"})
+                await client.get_deal(5)
+            finally:
+                await client.aclose()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(
+            [url.rsplit("/", 1)[-1] for url in requested_urls],
+            ["crm.deal.get", "crm.deal.update", "crm.deal.get"],
+        )
+
+    def test_concurrent_reads_share_single_request(self) -> None:
+        requested_urls: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requested_urls.append(str(request.url))
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"result": {"ID": "5"}})
+
+        async def scenario() -> tuple:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await asyncio.gather(*(client.get_deal(5) for _ in range(3)))
+            finally:
+                await client.aclose()
+
+        deals = asyncio.run(scenario())
+
+        self.assertEqual(requested_urls, ["https://example.invalid/rest/crm.deal.get"])
+        self.assertEqual([deal["ID"] for deal in deals], ["5", "5", "5"])
+        self.assertIsNot(deals[0], deals[1])
+
+
+class Bitrix24BatchTests(unittest.TestCase):
+    def test_builds_php_style_batch_command(self) -> None:
+        command = Bitrix24Client._build_batch_command(
+            "crm.deal.update",
+            {"id": 5, "fields": {"UF_CRM_1": "да", "FILES": ["a", "b"]}},
+        )
+
+        self.assertEqual(
+            command,
+            "crm.deal.update?id=5&fields%5BUF_CRM_1%5D=%D0%B4%D0%B0"
+            "&fields%5BFILES%5D%5B0%5D=a&fields%5BFILES%5D%5B1%5D=b",
+        )
+
+    def test_patient_name_is_loaded_with_single_batch_request(self) -> None:
+        payloads: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payloads.append(json.loads(request.content))
+            return httpx.Response(200, json={
+                "result": {
+                    "result": {
+                        "deal": {"ID": "5", "CONTACT_ID": "7"},
+                        "contact": {"LAST_NAME": "Иванов", "NAME": "Иван", "SECOND_NAME": "Иванович"},
+                    },
+                    "result_error": [],
+                },
+            })
+
+        async def scenario() -> str | None:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client.get_patient_name_from_deal(5)
+            finally:
+                await client.aclose()
+
+        patient_name = asyncio.run(scenario())
+
+        self.assertEqual(patient_name, "Иванов Иван Иванович")
+        self.assertEqual(len(payloads), 1)
+        self.assertEqual(payloads[0]["cmd"]["deal"], "crm.deal.get?id=5")
+        self.assertEqual(
+            payloads[0]["cmd"]["contact"],
+            "crm.contact.get?id=%24result%5Bdeal%5D%5BCONTACT_ID%5D",
+        )
+
+    def test_patient_name_skips_deal_request_when_contact_id_is_known(self) -> None:
+        requested_urls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested_urls.append(str(request.url))
+            return httpx.Response(200, json={"result": {"LAST_NAME": "Петрова", "NAME": "Анна"}})
+
+        async def scenario() -> str | None:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client.get_patient_name_from_deal(5, contact_id=7)
+            finally:
+                await client.aclose()
+
+        patient_name = asyncio.run(scenario())
+
+        self.assertEqual(patient_name, "Петрова Анна")
+        self.assertEqual(requested_urls, ["https://example.invalid/rest/crm.contact.get"])
+
+    def test_rejects_batch_larger_than_bitrix_limit(self) -> None:
+        client = Bitrix24Client("https://example.invalid/rest")
+        cmd = {str(i): ("crm.deal.get", {"id": i}) for i in range(51)}
+
+        with self.assertRaises(ValueError):
+            asyncio.run(client.batch(cmd))
+
+
+class Bitrix24BatcherTests(unittest.TestCase):
+    def test_coalesces_concurrent_writes_into_one_batch(self) -> None:
+        payloads: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payload = json.loads(request.content)
+            payloads.append(payload)
+            return httpx.Response(200, json={
+                "result": {
+                    "result": {"0": True, "1": 15},
+                    "result_error": {"2": {"error": "ACCESS_DENIED", "error_description": "Нет доступа"}},
+                },
+            })
+
+        async def scenario() -> tuple:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await asyncio.gather(
+                    client.update_deal_field(5, {"UF_CRM_1": "да"}),
+                    client.send_comment(5, "DEAL", "Отчёт"),
+                    client.update_lead_field(6, {"UF_CRM_1": "да"}),
+                )
+            finally:
+                await client.aclose()
+
+        with patch.object(settings, "BITRIX24_BATCH_MAX_WAIT_MS", 25):
+            deal_updated, comment_sent, lead_updated = asyncio.run(scenario())
+
+        self.assertTrue(deal_updated)
+        self.assertTrue(comment_sent)
+        self.assertFalse(lead_updated)
+        self.assertEqual(len(payloads), 1)
+        self.assertEqual(
+            [command.split("?", 1)[0] for command in payloads[0]["cmd"].values()],
+            ["crm.deal.update", "crm.timeline.comment.add", "crm.lead.update"],
+        )
+
+    def test_queue_is_disabled_by_default(self) -> None:
+        client = Bitrix24Client("https://example.invalid/rest")
+
+        self.assertIsNone(client._batcher)
+
+    def test_direct_write_bypasses_queue(self) -> None:
+        requests: list[tuple[str, dict]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={"result": True})
+
+        async def scenario() -> bool:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client.update_deal_field(5, {"UF_CRM_1": "ссылка"}, direct=True)
+            finally:
+                await client.aclose()
+
+        with patch.object(settings, "BITRIX24_BATCH_MAX_WAIT_MS", 25):
+            updated = asyncio.run(scenario())
+
+        self.assertTrue(updated)
+        self.assertEqual(
+            requests,
+            [("/rest/crm.deal.update", {"id": 5, "fields": {"UF_CRM_1": "ссылка"}})],
+        )
+
+    def test_slow_flush_does_not_block_next_batch(self) -> None:
+        async def scenario() -> dict:
+            client = Bitrix24Client("https://example.invalid/rest")
+            batcher = Bitrix24Batcher(client, max_batch=1, max_wait_ms=0)
+            release = asyncio.Event()
+
+            async def batch(cmd: dict) -> dict:
+                _, params = cmd["0"]
+                if params["id"] == 5:
+                    await release.wait()
+                return {"result": {"0": params["id"]}}
+
+            client.batch = batch
+            slow = asyncio.create_task(batcher.submit("crm.deal.update", {"id": 5}))
+            await asyncio.sleep(0)
+            fast = await asyncio.wait_for(batcher.submit("crm.deal.update", {"id": 6}), 1)
+            self.assertFalse(slow.done())
+            release.set()
+            self.assertEqual(await asyncio.wait_for(slow, 1), {"result": 5})
+            await batcher.aclose()
+            return fast
+
+        outcome = asyncio.run(scenario())
+
+        self.assertEqual(outcome, {"result": 6})
+
+    def test_aclose_resolves_commands_of_blocked_flush(self) -> None:
+        async def scenario() -> dict:
+            client = Bitrix24Client("https://example.invalid/rest")
+            batcher = Bitrix24Batcher(client, max_batch=1, max_wait_ms=0)
+            batch_started = asyncio.Event()
+
+            async def blocked_batch(cmd: dict) -> dict:
+                batch_started.set()
+                await asyncio.Event().wait()
+                return {}
+
+            client.batch = blocked_batch
+            submitted = asyncio.create_task(batcher.submit("crm.deal.update", {"id": 5}))
+            await asyncio.wait_for(batch_started.wait(), 1)
+            await batcher.aclose()
+            return await asyncio.wait_for(submitted, 1)
+
+        outcome = asyncio.run(scenario())
+
+        self.assertEqual(outcome["error"], "BATCH_CLOSED")
+
+
+class Bitrix24PdfUploadTests(unittest.TestCase):
+    def test_uploads_pdf_to_disk_as_multipart_without_base64(self) -> None:
+        pdf_bytes = b"%PDF-1.4 test report"
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            url = str(request.url)
+            if url.endswith("/disk.folder.uploadfile"):
+                return httpx.Response(200, json={
+                    "result": {"uploadUrl": "https://example.invalid/upload/1", "field": "file"},
+                })
+            if url == "https://example.invalid/upload/1":
+                return httpx.Response(200, json={"result": {"ID": 321}})
+            if url.endswith("/crm.activity.add"):
+                return httpx.Response(200, json={"result": 77})
+            return httpx.Response(404)
+
+        async def scenario() -> bool:
+            client = Bitrix24Client("https://example.invalid/rest")
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client.upload_pdf_to_entity(5, "DEAL", pdf_bytes, "report.pdf")
+            finally:
+                await client.aclose()
+
+        with patch.object(settings, "BITRIX24_DISK_FOLDER_ID", 10):
+            uploaded = asyncio.run(scenario())
+
+        self.assertTrue(uploaded)
+        upload_request = requests[1]
+        self.assertTrue(upload_request.headers["content-type"].startswith("multipart/form-data"))
+        self.assertIn(pdf_bytes, upload_request.content)
+        activity_fields = json.loads(requests[2].content)["fields"]
+        self.assertEqual(activity_fields["STORAGE_ELEMENT_IDS"], [321])
+
+
+if __name__ == "__main__":
+    unittest.main()
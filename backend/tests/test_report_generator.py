@@ -31,6 +31,169 @@ class ReportGeneratorFormattingTests(unittest.TestCase):
         self.assertIn("Голова", readable)
         self.assertIn("Голова", text)
 
+    def test_option_text_lookup_keeps_first_duplicate_and_unknown_values(self) -> None:
+        generator = ReportGenerator({
+            "nodes": [{
+                "id": "q1",
+                "type": "multi_choice",
+                "question_text": "Симптомы",
+                "options": [
+                    {"value": "a", "text": "Первый"},
+                    {"value": "a", "text": "Дубликат"},
+                    {"value": "b"},
+                ],
+            }],
+        })
+
+        line = generator._format_answer_for_report("q1", {"selected": ["a", "b", "c"]}, fmt="text")
+
+        self.assertEqual(line, "• Симптомы: Первый, b, c")
+
+    def test_readable_v1_report_escapes_patient_name(self) -> None:
+        generator = ReportGenerator({"nodes": []})
+
+        html = generator.generate_readable_html_report("<b>Иванов</b> & Ко", {})
+
+        self.assertIn("<title>Анкета пациента - &lt;b&gt;Иванов&lt;/b&gt; &amp; Ко</title>", html)
+        self.assertIn("<strong>Пациент:</strong> &lt;b&gt;Иванов&lt;/b&gt; &amp; Ко", html)
+        self.assertNotIn("<b>Иванов</b>", html)
+
+    def test_readable_v2_report_escapes_patient_name(self) -> None:
+        generator = ReportGenerator({"nodes": [{"id": "body_location", "type": "body_map"}]})
+
+        html = generator.generate_readable_html_report("<b>Иванов</b> & Ко", {})
+
+        self.assertEqual(generator.survey_version, 2)
+        self.assertIn("<title>Анкета — &lt;b&gt;Иванов&lt;/b&gt; &amp; Ко</title>", html)
+        self.assertIn("<strong>Пациент:</strong> &lt;b&gt;Иванов&lt;/b&gt; &amp; Ко", html)
+        self.assertNotIn("<b>Иванов</b>", html)
+        self.assertNotIn('<div class="block', html)
+
+    def test_unhandled_answers_follow_report_order_and_skip_info_screens(self) -> None:
+        generator = ReportGenerator({
+            "nodes": [
+                {"id": "b", "type": "text_input", "position": {"x": 0, "y": 20}},
+                {"id": "info", "type": "info_screen", "position": {"x": 0, "y": 5}},
+                {"id": "a", "type": "text_input", "position": {"x": 0, "y": 10}},
+                {"id": "handled", "type": "text_input"},
+            ],
+        })
+        answers = {"b": {}, "unknown": {}, "info": {}, "handled": {}, "a": {}}
+
+        self.assertEqual(generator._collect_unhandled_answers(answers, {"handled"}), ["a", "b"])
+        self.assertEqual(generator._collect_unhandled_answers({"info": {}}, set()), [])
+
+    def test_group_partition_is_shared_between_formats(self) -> None:
+        generator = ReportGenerator({
+            "groups": [{"id": "g1", "name": "Жалобы"}],
+            "nodes": [
+                {"id": "a", "type": "text_input", "group_id": "g1", "question_text": "A"},
+                {"id": "b", "type": "text_input", "question_text": "B"},
+            ],
+        })
+        answers = {"a": {"text": "x"}, "b": {"text": "y"}}
+
+        groups, ungrouped = generator._generate_grouped_answers(answers, fmt="text")
+        partition = generator._partition_answers_by_group(answers)
+        self.assertEqual(groups, [("Жалобы", ["• A: x"])])
+        self.assertEqual(ungrouped, ["• B: y"])
+        self.assertIs(generator._partition_answers_by_group(dict(answers)), partition)
+        self.assertEqual(generator._partition_answers_by_group({"b": {}}), ({"g1": []}, ["b"]))
+
+    def test_answer_text_is_escaped_only_in_html_formats(self) -> None:
+        generator = ReportGenerator({
+            "nodes": [{
+                "id": "q1",
+                "type": "text_input",
+                "question_text": "Жалобы",
+                "additional_fields": [{"id": "note", "label": "Заметка"}],
+            }],
+        })
+        answer = {"text": " <script>alert(1)</script> ", "note": "a & b"}
+
+        self.assertEqual(
+            generator._format_answer_for_report("q1", answer, fmt="html"),
+            "• <b>Жалобы:</b> &lt;script&gt;alert(1)&lt;/script&gt; <i>(Заметка: a &amp; b)</i>",
+        )
+        self.assertNotIn("<script>", generator._format_answer_for_report("q1", answer, fmt="readable"))
+        self.assertEqual(
+            generator._format_answer_for_report("q1", answer, fmt="text"),
+            "• Жалобы: <script>alert(1)</script> (Заметка: a & b)",
+        )
+
+    def test_allergy_details_are_escaped_only_in_html_formats(self) -> None:
+        generator = ReportGenerator({"nodes": []})
+        answers = {"risk_factors": {"selected": ["allergy"], "allergy_details": "<b>пенициллин</b> & мёд"}}
+
+        escaped = "&lt;b&gt;пенициллин&lt;/b&gt; &amp; мёд"
+        self.assertIn(f"Детали: {escaped}", generator._generate_risk_factors(answers))
+        self.assertIn(f"Детали аллергии: {escaped}", generator._generate_readable_risk_factors(answers))
+        self.assertIn("Детали: <b>пенициллин</b> & мёд", generator._generate_text_risk_factors(answers))
+
+    def test_raw_pain_and_edema_values_are_escaped_only_in_html_formats(self) -> None:
+        generator = ReportGenerator({"nodes": []})
+        answers = {
+            "pain_details": {"locations": ["head", "<i>"], "intensity": "<b>7</b>"},
+            "systems_screening": {"selected": ["cardio"]},
+            "cardio_details": {"selected": "rest", "edema": "<script>"},
+            "main_trigger": {"selected": "<img src=x>"},
+        }
+
+        pain_html = generator._generate_pain_details(answers)
+        self.assertIn("Голова, &lt;i&gt;", pain_html)
+        self.assertIn("&lt;b&gt;7&lt;/b&gt;/10", pain_html)
+        self.assertIn("&lt;script&gt;", generator._generate_systems_screening(answers))
+        self.assertIn("<li>&lt;script&gt;</li>", generator._generate_readable_systems_screening(answers))
+        self.assertIn("Голова, <i>", generator._generate_text_pain_details(answers))
+        self.assertIn("  • <script>", generator._generate_text_systems_screening(answers))
+        self.assertIn("&lt;img src=x&gt;", generator._generate_main_complaint(answers))
+        self.assertIn("&lt;img src=x&gt;", generator._generate_readable_main_complaint(answers))
+        self.assertIn("<img src=x>", generator._generate_text_main_complaint(answers))
+
+
+class ReportGeneratorAnalysisRulesTests(unittest.TestCase):
+    def test_compiled_rules_respect_trigger_modes(self) -> None:
+        generator = ReportGenerator({
+            "nodes": [],
+            "analysis_rules": [
+                {
+                    "name": "Все",
+                    "message": " Лихорадка и кашель ",
+                    "trigger_mode": "all",
+                    "triggers": [
+                        {"node_id": "temp", "option_value": "38", "match_mode": "gte"},
+                        {"node_id": "temp", "option_value": "high"},
+                        {"node_id": "notes", "option_value": " КАШЕЛЬ ", "match_mode": "contains"},
+                    ],
+                },
+                {
+                    "message": "Не должно сработать",
+                    "color": "green",
+                    "trigger_mode": "all",
+                    "triggers": [
+                        {"node_id": "temp", "option_value": "38", "match_mode": "gte"},
+                        {"node_id": "consent", "option_value": "False"},
+                    ],
+                },
+                {"message": "Без триггеров", "triggers": []},
+                {"message": "   ", "triggers": [{"node_id": "temp", "option_value": "1"}]},
+            ],
+        })
+        answers = {
+            "temp": {"value": "38.5"},
+            "notes": {"text": "Сухой кашель по ночам"},
+            "consent": {"selected": True},
+        }
+
+        self.assertEqual(
+            generator._evaluate_analysis_rules_with_color(answers),
+            [{"message": "Лихорадка и кашель", "color": "red", "name": "Все"}],
+        )
+        self.assertTrue(generator._check_trigger({"option_value": "true"}, {"selected": True}))
+        self.assertFalse(generator._check_trigger({"option_value": "abc", "match_mode": "gte"}, {"value": 5}))
+        self.assertTrue(generator._check_trigger({"option_value": "7", "match_mode": "gte"}, {"value": 7}))
+        self.assertFalse(generator._check_trigger({"option_value": "7.5"}, {"value": 7}))
+
 
 if __name__ == "__main__":
     unittest.main()